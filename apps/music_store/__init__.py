@@ -0,0 +1 @@
+default_app_config = 'apps.music_store.apps.MusicStoreAppDefaultConfig'
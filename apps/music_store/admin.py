@@ -2,18 +2,23 @@ from django import forms
 from django.conf.urls import url
 from django.contrib import admin
 from django.forms.widgets import Textarea
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from apps.music_store.models import (
     Album,
     BoughtAlbum,
     BoughtTrack,
+    ImportJob,
     LikeTrack,
     ListenTrack,
     Track,
+    TrackDailyListens,
     PaymentTransaction,
     PaymentMethod,
+    UserDailyListens,
 )
+from apps.music_store.tasks import import_archive
 from apps.music_store.views import AlbumUploadArchiveView
 
 admin.site.register(PaymentMethod)
@@ -101,6 +106,7 @@ class TrackAdmin(admin.ModelAdmin):
         }),
         (_('Content'), {
             'fields': (
+                'content_file',
                 'full_version',
                 'free_version',
             )
@@ -194,6 +200,38 @@ class ListenTrackAdmin(admin.ModelAdmin):
     ordering = ('created',)
 
 
+@admin.register(TrackDailyListens)
+class TrackDailyListensAdmin(admin.ModelAdmin):
+    """Custom form for daily listens of tracks"""
+    list_display = (
+        'track',
+        'day',
+        'count',
+    )
+    list_filter = (
+        'day',
+    )
+    list_select_related = ('track',)
+    list_per_page = 20
+    ordering = ('-day', '-count')
+
+
+@admin.register(UserDailyListens)
+class UserDailyListensAdmin(admin.ModelAdmin):
+    """Custom form for daily listens of users"""
+    list_display = (
+        'user',
+        'day',
+        'count',
+    )
+    list_filter = (
+        'day',
+    )
+    list_select_related = ('user',)
+    list_per_page = 20
+    ordering = ('-day', '-count')
+
+
 @admin.register(BoughtAlbum)
 class BoughtAlbumAdmin(admin.ModelAdmin):
     """Custom form for Bought albums"""
@@ -230,3 +268,63 @@ class BoughtTrackAdmin(admin.ModelAdmin):
     )
     list_per_page = 20
     ordering = ('created',)
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """Custom form for Import jobs
+
+    Page of running job is refreshed periodically to show its progress.
+
+    """
+    list_display = (
+        'file',
+        'status',
+        'processed',
+        'total',
+        'created',
+    )
+    list_filter = (
+        'status',
+    )
+    list_per_page = 20
+    ordering = ('-created',)
+    fields = (
+        'file',
+        'status',
+        'processed',
+        'total',
+        'stats',
+        'errors',
+        'created',
+        'modified',
+    )
+    readonly_fields = fields
+    actions = ('resume',)
+
+    change_form_template = 'admin/import_job/change_form.html'
+
+    def has_add_permission(self, request):
+        """Jobs are created by uploading of archive"""
+        return False
+
+    def resume(self, request, queryset):
+        """Resume failed or stale jobs from their last committed offsets.
+
+        Each job is claimed by a conditional update, so it is resumed once
+        even if action is run twice, and running jobs with recent progress
+        are never resumed.
+
+        """
+        resumed = 0
+        for job in queryset.resumable():
+            claimed = ImportJob.objects.resumable().filter(pk=job.pk).update(
+                status=ImportJob.STATUS_PENDING,
+                modified=timezone.now(),
+            )
+            if claimed:
+                import_archive.delay(job.pk)
+                resumed += 1
+        self.message_user(request, _('%d jobs resumed') % resumed)
+
+    resume.short_description = _('Resume selected jobs')
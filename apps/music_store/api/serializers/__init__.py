@@ -1,17 +1,21 @@
 from .album_track import AlbumSerializer, TrackSerializer
 from .bought import BoughtAlbumSerializer, BoughtTrackSerializer
+from .cart import CartSerializer
 from .like_listen import LikeTrackSerializer, ListenTrackSerializer
 from .payment import PaymentAccountSerializer, PaymentMethodSerializer
 from .search import GlobalSearchSerializer
+from .track_status import TrackStatusQuerySerializer
 
 __all__ = (
     'AlbumSerializer',
     'TrackSerializer',
     'BoughtAlbumSerializer',
     'BoughtTrackSerializer',
+    'CartSerializer',
     'LikeTrackSerializer',
     'ListenTrackSerializer',
     'PaymentAccountSerializer',
     'PaymentMethodSerializer',
     'GlobalSearchSerializer',
+    'TrackStatusQuerySerializer',
 )
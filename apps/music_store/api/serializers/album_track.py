@@ -1,5 +1,9 @@
+from django.db import models
+
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
+from apps.music_store.entitlements import Entitlements
 from apps.music_store.models import Album, Track
 
 __all__ = (
@@ -27,16 +31,38 @@ class AlbumSerializer(serializers.ModelSerializer):
             'image',
             'price',
             'tracks',
+            'likes_count',
+            'listens_count',
+            'purchases_count',
         )
 
 
+class TrackListSerializer(serializers.ListSerializer):
+    """List serializer for Music Tracks
+
+    Resolves which tracks of the list are owned by requester and loads
+    their content with a couple of queries instead of a query per track.
+
+    """
+
+    def to_representation(self, data):
+        tracks = data.all() if isinstance(data, models.Manager) else data
+        tracks = list(tracks)
+        self.child.set_owned_content(tracks)
+        return super().to_representation(tracks)
+
+
 class TrackSerializer(serializers.ModelSerializer):
     """Serializer for Music Tracks"""
 
     content = serializers.SerializerMethodField()
 
+    # full versions of serialized tracks owned by requester
+    owned_content = None
+
     class Meta:
         model = Track
+        list_serializer_class = TrackListSerializer
         fields = (
             'id',
             'author',
@@ -44,23 +70,57 @@ class TrackSerializer(serializers.ModelSerializer):
             'album',
             'price',
             'content',
+            'likes_count',
+            'listens_count',
+            'purchases_count',
+        )
+
+    def _get_user(self):
+        """Get authenticated requester or None"""
+        request = self.context.get('request', None)
+        if request is None or not request.user.is_authenticated:
+            return None
+        return request.user
+
+    def set_owned_content(self, tracks):
+        """Load full versions of ``tracks`` owned by requester.
+
+        Ownership is resolved with cached entitlements of requester (see
+        ``entitlements.py``), then content of owned tracks only is loaded
+        with one query, so tracks may be fetched with deferred
+        ``full_version`` (see ``TrackQuerySet.without_content``).
+
+        Args:
+            tracks (list): tracks to be serialized.
+
+        """
+        entitlements = Entitlements.for_user(self._get_user())
+        self.owned_content = Track.objects.full_versions(
+            entitlements.owned_tracks(tracks)
         )
 
     def get_content(self, obj):
         """Get free or full version of track.
 
-        Full version is provided when track is bought by user.
+        Full version is provided when track is bought by user, if it's
+        stored in ``content_file``, URL to download it is provided instead.
         Otherwise free version is provided.
 
         Args:
             obj (Track): an instance of Track.
 
         """
-        request = self.context.get('request', None)
-        if request is None:
-            return obj.free_version
+        # ownership isn't resolved when single track is serialized
+        if self.owned_content is None:
+            self.set_owned_content([obj])
 
-        user = request.user
-        if user.is_authenticated and obj.is_bought(user):
-            return obj.full_version
-        return obj.free_version
+        if obj.pk not in self.owned_content:
+            return obj.free_version
+        full_version = self.owned_content[obj.pk]
+        if full_version is None:
+            return reverse(
+                'track-content',
+                kwargs={'pk': obj.pk},
+                request=self.context.get('request', None),
+            )
+        return full_version
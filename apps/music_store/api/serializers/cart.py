@@ -0,0 +1,70 @@
+from django.conf import settings
+
+from rest_framework import serializers
+
+from apps.music_store.models import Album, PaymentMethod, Track
+
+__all__ = ('CartSerializer',)
+
+
+class CartSerializer(serializers.Serializer):
+    """Serializer for buying many tracks and albums at once
+
+    Items are resolved with one query per item type.
+
+    """
+    tracks = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        default=list,
+    )
+    albums = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        default=list,
+    )
+    payment_method = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+    )
+
+    def _get_items(self, model, ids):
+        """Get items of ``model`` by ``ids`` with a single query"""
+        if not ids:
+            return []
+        items = model.objects.in_bulk(set(ids))
+        missing = set(ids) - set(items)
+        if missing:
+            raise serializers.ValidationError(
+                f'Items not found: {sorted(missing)}'
+            )
+        return list(items.values())
+
+    def validate_tracks(self, value):
+        return self._get_items(Track, value)
+
+    def validate_albums(self, value):
+        return self._get_items(Album, value)
+
+    def validate_payment_method(self, value):
+        if value is None:
+            return None
+        user = self.context['request'].user
+        payment_method = PaymentMethod.objects.filter(
+            owner=user,
+            pk=value,
+        ).first()
+        if payment_method is None:
+            raise serializers.ValidationError('Payment method not found')
+        return payment_method
+
+    def validate(self, attrs):
+        size = len(attrs['tracks']) + len(attrs['albums'])
+        if not size:
+            raise serializers.ValidationError('Cart is empty')
+        if size > settings.MUSIC_STORE_CART_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'Cart can contain at most '
+                f'{settings.MUSIC_STORE_CART_MAX_ITEMS} items'
+            )
+        return attrs
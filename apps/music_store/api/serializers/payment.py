@@ -33,4 +33,8 @@ class PaymentAccountSerializer(serializers.ModelSerializer):
         )
 
     def get_default_payment(self, obj):
-        return obj.default_payment.pk
+        """Get id of default method from prefetched ``payment_methods``"""
+        for payment_method in obj.payment_methods.all():
+            if payment_method.is_default:
+                return payment_method.pk
+        return None
@@ -0,0 +1,30 @@
+from django.conf import settings
+
+from rest_framework import serializers
+
+__all__ = ('TrackStatusQuerySerializer',)
+
+
+class TrackStatusQuerySerializer(serializers.Serializer):
+    """Serializer for query of tracks statuses
+
+    Tracks are passed as comma separated ids, i.e. ``?ids=1,2,3``.
+
+    """
+    ids = serializers.CharField()
+
+    def validate_ids(self, value):
+        try:
+            ids = list({int(pk) for pk in value.split(',') if pk.strip()})
+        except ValueError:
+            raise serializers.ValidationError(
+                'Comma separated list of integers is required'
+            )
+        if not ids:
+            raise serializers.ValidationError('No tracks ids')
+        if len(ids) > settings.MUSIC_STORE_TRACK_STATUS_MAX_IDS:
+            raise serializers.ValidationError(
+                f'At most {settings.MUSIC_STORE_TRACK_STATUS_MAX_IDS} '
+                f'tracks are allowed'
+            )
+        return ids
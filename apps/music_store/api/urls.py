@@ -16,5 +16,8 @@ router.register(r'payment_methods', views.PaymentMethodViewSet)
 urlpatterns = [
     url(r'^', include(router.urls)),
     url(r'^account/$', views.AccountView.as_view()),
+    url(r'^autocomplete/$', views.AutocompleteView.as_view()),
+    url(r'^cache_stats/$', views.CacheStatsView.as_view()),
+    url(r'^cart/buy/$', views.CartBuyView.as_view()),
     url(r'^search/$', views.GlobalSearchList.as_view()),
 ]
@@ -1,7 +1,11 @@
-from django.db.models import Q
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, prefetch_related_objects
+from django.utils import timezone
 from rest_framework import filters, generics, permissions, viewsets, status
-from rest_framework.decorators import detail_route
-from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import detail_route, list_route
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
@@ -13,11 +17,25 @@ from apps.music_store.api.serializers import (
     ListenTrackSerializer,
     BoughtAlbumSerializer,
     BoughtTrackSerializer,
+    CartSerializer,
     PaymentAccountSerializer,
     PaymentMethodSerializer,
-    GlobalSearchSerializer
+    GlobalSearchSerializer,
+    TrackStatusQuerySerializer,
+)
+from apps.music_store import autocomplete
+from apps.music_store.caching import get_cache_stats, reset_cache_stats
+from apps.music_store.cart import Cart
+from apps.music_store.content import open_track_content
+from apps.music_store.entitlements import Entitlements
+from apps.music_store.listens import record_listen
+from apps.music_store.search import search_items
+from libs.api.mixins import ConditionalGetMixin
+from libs.api.pagination import (
+    OrderByIDCursorPagination,
+    OrderByModifiedCursorPagination,
 )
-from apps.users.models import AppUser
+from libs.files import ranged_file_response
 from ...music_store.models import (
     Album,
     BoughtAlbum,
@@ -27,6 +45,7 @@ from ...music_store.models import (
     Track,
     PaymentMethod,
     PaymentNotFound,
+    PaymentTransaction,
     NotEnoughMoney,
     ItemAlreadyBought
 )
@@ -45,6 +64,14 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return super().get_queryset().filter(owner=self.request.user)
 
+    @detail_route(methods=['post'], url_path='set_default')
+    def set_default(self, request, **kwargs):
+        """Make payment method default one of user"""
+        payment_method = self.get_object()
+        payment_method.set_default()
+        serializer = self.get_serializer(payment_method)
+        return Response(serializer.data)
+
 
 # ##############################################################################
 # ACCOUNTS
@@ -56,10 +83,12 @@ class AccountView(generics.RetrieveAPIView):
 
     serializer_class = PaymentAccountSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    queryset = AppUser.objects.all()
 
     def get_object(self):
-        return super().get_queryset().get(pk=self.request.user.pk)
+        """Get user loaded by authentication with payment methods"""
+        user = self.request.user
+        prefetch_related_objects([user], 'payment_methods')
+        return user
 
 
 # ##############################################################################
@@ -72,6 +101,7 @@ class BoughtTrackViewSet(viewsets.mixins.ListModelMixin,
     """View to display the list of purchased user tracks"""
     serializer_class = BoughtTrackSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OrderByModifiedCursorPagination
     queryset = BoughtTrack.objects.all()
 
     def get_queryset(self):
@@ -90,13 +120,90 @@ class BoughtAlbumViewSet(BoughtTrackViewSet):
     queryset = BoughtAlbum.objects.all()
 
 
+# ##############################################################################
+# CART
+# ##############################################################################
+
+
+class CartBuyView(generics.GenericAPIView):
+    """Buy many tracks and albums at once.
+
+    All items are paid by a single payment transaction with a constant
+    number of queries regardless of cart size.
+
+    """
+    serializer_class = CartSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        cart = Cart(request.user, tracks=data['tracks'], albums=data['albums'])
+        try:
+            payment = cart.checkout(data.get('payment_method'))
+        except (PaymentNotFound, NotEnoughMoney, ItemAlreadyBought) as e:
+            return Response(
+                data={'message': e.message},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            data={'transaction': payment.pk, 'amount': -payment.amount},
+            status=status.HTTP_200_OK
+        )
+
+
+def get_int_param(request, name, default, maximum=None):
+    """Get non-negative integer parameter of the request"""
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise ValidationError(f"Parameter '{name}' must be integer.")
+    if value < 0:
+        raise ValidationError(f"Parameter '{name}' must be positive.")
+    return min(value, maximum) if maximum else value
+
+
 # ##############################################################################
 # ITEMS
 # ##############################################################################
 
-class ItemViewSet(viewsets.mixins.ListModelMixin,
+# popularity counters, which items can be filtered and sorted by
+POPULARITY_FILTERS = {
+    counter: ['exact', 'gte', 'lte']
+    for counter in ('likes_count', 'listens_count', 'purchases_count')
+}
+
+
+class ItemViewSet(ConditionalGetMixin,
+                  viewsets.mixins.ListModelMixin,
                   viewsets.mixins.RetrieveModelMixin,
                   viewsets.GenericViewSet):
+    # popularity counters are updated without change of ``modified``
+    etag_fields = (
+        'modified',
+        'likes_count',
+        'listens_count',
+        'purchases_count',
+    )
+    filter_backends = (
+        filters.SearchFilter,
+        filters.OrderingFilter,
+        DjangoFilterBackend,
+    )
+    # ordering by nullable ``price`` is not allowed, as keyset of cursor
+    # can't contain null, ties of counters are broken by id
+    ordering_fields = (
+        'id',
+        'likes_count',
+        'listens_count',
+        'purchases_count',
+    )
+    ordering = ('id',)
+    pagination_class = OrderByIDCursorPagination
+
     @detail_route(
         methods=['post'],
         permission_classes=(permissions.IsAuthenticated,),
@@ -137,26 +244,107 @@ class ItemViewSet(viewsets.mixins.ListModelMixin,
 class AlbumViewSet(ItemViewSet):
     """Operations on music albums
 
+    Albums and ids of their tracks are cached (see ``caching.py``).
+
     """
-    queryset = Album.objects.all()
+    queryset = Album.objects.with_track_ids(cache=True)
     serializer_class = AlbumSerializer
-
-    filter_backends = (filters.SearchFilter, DjangoFilterBackend)
-    filter_fields = ('title', 'author', 'price')
+    filter_fields = dict(
+        title=['exact'],
+        author=['exact'],
+        price=['exact'],
+        **POPULARITY_FILTERS
+    )
     search_fields = ('title', 'author',)
 
+    def get_etag_values(self, album):
+        """Representation of album contains ids of its tracks"""
+        track_ids = tuple(track.pk for track in album.tracks.all())
+        return super().get_etag_values(album) + (track_ids,)
+
 
 class TrackViewSet(ItemViewSet):
     """Operations on music tracks
 
+    Tracks are cached (see ``caching.py``), content of owned tracks is
+    loaded from database.
+
     """
-    queryset = Track.objects.all()
+    queryset = Track.objects.without_content().cache()
     serializer_class = TrackSerializer
-
-    filter_backends = (filters.SearchFilter, DjangoFilterBackend)
-    filter_fields = ('title', 'author', 'album', 'price')
+    filter_fields = dict(
+        title=['exact'],
+        author=['exact'],
+        album=['exact'],
+        price=['exact'],
+        **POPULARITY_FILTERS
+    )
     search_fields = ('title', 'author',)
 
+    def get_etag_marker(self, request):
+        """Content of tracks depends on purchases of user"""
+        if not request.user.is_authenticated:
+            return None
+        return PaymentTransaction.objects.filter(user=request.user) \
+            .aggregate(last=Max('pk'))['last']
+
+    @list_route(
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='status',
+        url_name='status',
+    )
+    def statuses(self, request, **kwargs):
+        """Get like, ownership and listens status of tracks for user.
+
+        Tracks are passed as comma separated ids, i.e. ``?ids=1,2,3``.
+        Response is a dict of track id -> ``liked``, ``owned`` flags and
+        number of ``listens``.
+
+        """
+        serializer = TrackStatusQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            Track.objects.statuses(
+                request.user,
+                serializer.validated_data['ids'],
+            )
+        )
+
+    @list_route(
+        methods=['get'],
+        url_path='most_played',
+        url_name='most_played',
+    )
+    def most_played(self, request, **kwargs):
+        """List top tracks by number of plays for the last ``days`` days.
+
+        Plays are read from daily rollups, so listens of today are not
+        counted. Number of tracks is limited by ``limit`` parameter.
+
+        """
+        days = get_int_param(
+            request,
+            'days',
+            settings.MUSIC_STORE_MOST_PLAYED_DAYS,
+        )
+        limit = get_int_param(
+            request,
+            'limit',
+            settings.MUSIC_STORE_MOST_PLAYED_LIMIT,
+            settings.MUSIC_STORE_MOST_PLAYED_LIMIT,
+        )
+
+        since = timezone.localdate() - timedelta(days)
+        tracks = list(
+            Track.objects.without_content().most_played(since)[:limit]
+        )
+
+        data = self.get_serializer(tracks, many=True).data
+        for item, track in zip(data, tracks):
+            item['plays'] = track.plays
+        return Response(data)
+
     @detail_route(
         methods=['post', 'delete'],
         permission_classes=[permissions.IsAuthenticated],
@@ -188,6 +376,24 @@ class TrackViewSet(ItemViewSet):
                 status=status.HTTP_200_OK
             )
 
+    @detail_route(
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='content',
+        url_name='content',
+    )
+    def content(self, request, **kwargs):
+        """Stream full content of the track owned by user.
+
+        Supports HTTP ``Range`` header to download content by parts.
+
+        """
+        track = self.get_object()
+        if not Entitlements.for_user(request.user).owns_track(track):
+            raise PermissionDenied('Track is not bought')
+
+        return ranged_file_response(request, open_track_content(track))
+
     @detail_route(
         methods=['post'],
         permission_classes=[permissions.IsAuthenticated],
@@ -197,11 +403,13 @@ class TrackViewSet(ItemViewSet):
     def listen(self, request, **kwargs):
         """Create an entry about user listen to the track.
 
+        Listen is buffered and is written into database later.
+
         """
         user = request.user
         track = self.get_object()
 
-        track.listen(user)
+        record_listen(user, track)
         return Response(
             data={'message': 'Yeah! Music!'},
             status=status.HTTP_200_OK
@@ -217,10 +425,17 @@ class LikeTrackViewSet(viewsets.mixins.ListModelMixin,
                        viewsets.GenericViewSet):
     """Authorised user sees list of liked tracks.
 
+    Likes are ordered from newest and paginated by cursor, when
+    ``pageSize`` is passed.
+
     """
     queryset = LikeTrack.objects.all()
     serializer_class = LikeTrackSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OrderByModifiedCursorPagination
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
 
 
 # ##############################################################################
@@ -232,10 +447,17 @@ class ListenTrackViewSet(viewsets.mixins.ListModelMixin,
                          viewsets.GenericViewSet):
     """Authorised user sees list of listened tracks.
 
+    Listens are ordered from newest and paginated by cursor, when
+    ``pageSize`` is passed.
+
     """
     queryset = ListenTrack.objects.all()
     serializer_class = ListenTrackSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OrderByModifiedCursorPagination
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
 
 
 # ##############################################################################
@@ -246,8 +468,9 @@ class ListenTrackViewSet(viewsets.mixins.ListModelMixin,
 class GlobalSearchList(APIView):
     """View for global searching.
 
-    Search Tracks and Albums, which contain the value of get-parameter `query`
-    in the `title` or `author` fields.
+    Search Tracks and Albums by get-parameter `query` (see
+    ``apps.music_store.search``), ordered by relevance. Each type is
+    paginated separately by `limit` and `offset` parameters.
 
     """
     search_param = 'query'
@@ -258,8 +481,69 @@ class GlobalSearchList(APIView):
             raise ValidationError(f"Query parameter '{self.search_param}' "
                                   f"is required.")
 
-        search_filter = Q(author__icontains=query) | Q(title__icontains=query)
-        tracks = Track.objects.filter(search_filter)
-        albums = Album.objects.filter(search_filter)
-        result = GlobalSearchSerializer({'tracks': tracks, 'albums': albums})
+        limit = get_int_param(
+            request,
+            'limit',
+            settings.MUSIC_STORE_SEARCH_LIMIT,
+            settings.MUSIC_STORE_SEARCH_MAX_LIMIT,
+        )
+        offset = get_int_param(request, 'offset', 0)
+        page = slice(offset, offset + limit)
+
+        tracks = search_items(Track.objects.without_content(), query, page)
+        albums = search_items(Album.objects.with_track_ids(), query, page)
+        result = GlobalSearchSerializer(
+            {'tracks': tracks, 'albums': albums},
+            context={'request': request},
+        )
         return Response(data=result.data, status=status.HTTP_200_OK)
+
+
+# ##############################################################################
+# AUTOCOMPLETE
+# ##############################################################################
+
+
+class AutocompleteView(APIView):
+    """View for autocomplete of tracks and albums.
+
+    Suggests tracks and albums, which words of `title` or `author` start
+    with the value of get-parameter `query`. Suggestions are served from
+    in-process index without queries to the database.
+
+    """
+    search_param = 'query'
+
+    def get(self, request):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            raise ValidationError(f"Query parameter '{self.search_param}' "
+                                  f"is required.")
+
+        suggestions = autocomplete.index.lookup(
+            query,
+            settings.MUSIC_STORE_AUTOCOMPLETE_LIMIT,
+        )
+        return Response(data=suggestions, status=status.HTTP_200_OK)
+
+
+# ##############################################################################
+# CACHE STATISTICS
+# ##############################################################################
+
+
+class CacheStatsView(APIView):
+    """Statistics of cached reads of catalog for admins.
+
+    GET returns numbers of hits, misses and hit ratio per model, DELETE
+    resets them.
+
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(data=get_cache_stats(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        reset_cache_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class MusicStoreAppDefaultConfig(AppConfig):
@@ -7,3 +8,32 @@ class MusicStoreAppDefaultConfig(AppConfig):
 
     name = 'apps.music_store'
     verbose_name = 'MusicStore'
+
+    def ready(self):
+        """Connect signal handlers
+
+        Keep autocomplete index in sync with tracks and albums, keep
+        entitlements of users in sync with purchases and count hits and
+        misses of cached catalog.
+
+        """
+        from django.conf import settings
+
+        from cacheops.signals import cache_read
+
+        from . import autocomplete, caching, entitlements
+        from .models import BoughtAlbum, BoughtTrack
+
+        for model in autocomplete.MODELS.values():
+            post_save.connect(autocomplete.item_saved, sender=model)
+            post_delete.connect(autocomplete.item_deleted, sender=model)
+
+        for model in (BoughtTrack, BoughtAlbum):
+            post_save.connect(entitlements.purchase_saved, sender=model)
+            post_delete.connect(entitlements.purchase_deleted, sender=model)
+        post_save.connect(
+            entitlements.user_created,
+            sender=settings.AUTH_USER_MODEL,
+        )
+
+        cache_read.connect(caching.count_cache_read)
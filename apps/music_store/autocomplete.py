@@ -0,0 +1,274 @@
+"""In-process prefix index for autocomplete of tracks and albums.
+
+Index is a sorted array of lowercase keys, one key per word of title and
+author of every item (a key is the text from the word to the end), so
+lookup of a prefix is a binary search and a scan of matched keys without
+any query to the database.
+
+Index is built and refreshed by a background thread of each process, which
+is started by the first lookup in the process (so it works with prefork
+servers, which import application before fork), lookups never wait for it
+and are served from the previous index meanwhile. Index is updated on
+commit of ``post_save`` and ``post_delete`` signals of ``Track`` and
+``Album`` (see ``apps.py``). Changes are also appended to a log in Redis,
+which other processes replay every
+``MUSIC_STORE_AUTOCOMPLETE_REFRESH_INTERVAL`` seconds. When the log is
+reset (i.e. after bulk import, which bypasses signals), version of index is
+increased and every process rebuilds its index from scratch.
+
+"""
+import logging
+import os
+import time
+from bisect import bisect_left, insort
+from threading import Lock, RLock, Thread
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from cacheops.redis import redis_client
+from redis.exceptions import RedisError
+
+from .models import Album, Track
+
+logger = logging.getLogger(__name__)
+
+CHANGES_KEY = 'music_store:autocomplete:changes'
+VERSION_KEY = 'music_store:autocomplete:version'
+
+# max length of log of changes, longer log is reset
+MAX_CHANGES = 100000
+
+MODELS = {
+    'track': Track,
+    'album': Album,
+}
+
+
+def item_keys(title, author):
+    """Get index keys of item with ``title`` and ``author``"""
+    keys = set()
+    for text in (title, author):
+        words = (text or '').lower().split()
+        keys.update(' '.join(words[i:]) for i in range(len(words)))
+    return keys
+
+
+class PrefixIndex:
+    """Sorted array of keys of tracks and albums
+
+    Attributes:
+        entries (list): sorted tuples of (key, type, id).
+        items (dict): (type, id) -> (title, author) of indexed items.
+        version (int): version of index in Redis, index was built for.
+        applied (int): number of changes from Redis log applied to index.
+
+    """
+
+    def __init__(self):
+        self.lock = RLock()
+        # only one thread builds or refreshes index at a time
+        self.refresh_lock = Lock()
+        # id of process, which started background thread
+        self.pid = None
+        self.entries = None
+        self.items = {}
+        self.version = None
+        self.applied = 0
+
+    def start(self):
+        """Start background thread, which builds and refreshes index.
+
+        Thread is started once per process: a forked process doesn't have
+        threads of its parent, so it starts its own.
+
+        """
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            Thread(
+                target=self._refresh_forever,
+                name='autocomplete-index',
+                daemon=True,
+            ).start()
+            self.pid = os.getpid()
+
+    def _refresh_forever(self):
+        """Refresh index every ``MUSIC_STORE_AUTOCOMPLETE_REFRESH_INTERVAL``"""
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Refresh of autocomplete index failed')
+            finally:
+                close_old_connections()
+            time.sleep(settings.MUSIC_STORE_AUTOCOMPLETE_REFRESH_INTERVAL)
+
+    def build(self):
+        """Build index of all tracks and albums"""
+        version, applied = self._get_state()
+        entries, items = [], {}
+        for kind, model in MODELS.items():
+            rows = model.objects.order_by() \
+                .values_list('pk', 'title', 'author')
+            for pk, title, author in rows.iterator():
+                items[kind, pk] = (title, author)
+                entries.extend(
+                    (key, kind, pk) for key in item_keys(title, author)
+                )
+        entries.sort()
+
+        with self.lock:
+            self.entries, self.items = entries, items
+            self.version, self.applied = version, applied
+
+    def add(self, kind, pk, title, author):
+        """Add item into index or update it"""
+        with self.lock:
+            if self.entries is None:
+                return
+            self.remove(kind, pk)
+            self.items[kind, pk] = (title, author)
+            for key in item_keys(title, author):
+                insort(self.entries, (key, kind, pk))
+
+    def remove(self, kind, pk):
+        """Remove item from index"""
+        with self.lock:
+            if self.entries is None or (kind, pk) not in self.items:
+                return
+            for key in item_keys(*self.items.pop((kind, pk))):
+                position = bisect_left(self.entries, (key, kind, pk))
+                del self.entries[position]
+
+    def lookup(self, prefix, limit):
+        """Find items, which words start with ``prefix``.
+
+        Nothing is found until index is built. The first lookup in a
+        process starts refresh of index in background (unless
+        ``MUSIC_STORE_AUTOCOMPLETE_BACKGROUND_REFRESH`` is disabled).
+
+        Returns:
+            list: dicts with ``type``, ``id``, ``title`` and ``author`` of
+                at most ``limit`` items, ordered by matched key.
+
+        """
+        if settings.MUSIC_STORE_AUTOCOMPLETE_BACKGROUND_REFRESH:
+            self.start()
+        prefix = ' '.join(prefix.lower().split())
+        found = []
+        with self.lock:
+            entries = self.entries or []
+            position = bisect_left(entries, (prefix,))
+            while position < len(entries) and len(found) < limit:
+                key, kind, pk = entries[position]
+                if not key.startswith(prefix):
+                    break
+                if (kind, pk) not in found:
+                    found.append((kind, pk))
+                position += 1
+            return [
+                dict(zip(
+                    ('type', 'id', 'title', 'author'),
+                    (kind, pk) + self.items[kind, pk],
+                ))
+                for kind, pk in found
+            ]
+
+    def refresh(self):
+        """Build index or apply changes made by other processes.
+
+        Index is built from scratch when it's not built yet or when version
+        of index in Redis is changed, meanwhile the previous index is used.
+
+        """
+        with self.refresh_lock:
+            version, count = self._get_state()
+            if self.entries is None or version != self.version:
+                self.build()
+            elif count != self.applied:
+                self._apply_changes(count)
+
+    def _apply_changes(self, count):
+        """Apply changes of log in Redis up to ``count``"""
+        changes = redis_client.lrange(CHANGES_KEY, self.applied, count - 1)
+        ids = {kind: set() for kind in MODELS}
+        for change in changes:
+            kind, pk = change.decode().split(':')
+            ids[kind].add(int(pk))
+        for kind, pks in ids.items():
+            if not pks:
+                continue
+            rows = MODELS[kind].objects.filter(pk__in=pks) \
+                .values_list('pk', 'title', 'author')
+            for pk, title, author in rows:
+                pks.discard(pk)
+                self.add(kind, pk, title, author)
+            for pk in pks:
+                self.remove(kind, pk)
+        self.applied = count
+
+    def _get_state(self):
+        """Get version of index and length of log of changes in Redis.
+
+        If Redis is unavailable, state of the index is kept.
+
+        """
+        try:
+            pipeline = redis_client.pipeline()
+            pipeline.get(VERSION_KEY)
+            pipeline.llen(CHANGES_KEY)
+            version, count = pipeline.execute()
+        except RedisError:
+            return self.version, self.applied
+        return version, count
+
+
+index = PrefixIndex()
+
+
+def log_change(kind, pk):
+    """Append change of item to log for other processes"""
+    try:
+        count = redis_client.rpush(CHANGES_KEY, f'{kind}:{pk}')
+        if count > MAX_CHANGES:
+            reset()
+    except RedisError:
+        pass
+
+
+def reset():
+    """Make all processes rebuild their indexes in background"""
+    try:
+        pipeline = redis_client.pipeline()
+        pipeline.incr(VERSION_KEY)
+        pipeline.delete(CHANGES_KEY)
+        pipeline.execute()
+    except RedisError:
+        pass
+
+
+def item_saved(sender, instance, **kwargs):
+    """Update item in index on commit of ``post_save`` signal"""
+    kind = sender._meta.model_name
+    pk, title, author = instance.pk, instance.title, instance.author
+
+    def add():
+        index.add(kind, pk, title, author)
+        log_change(kind, pk)
+
+    transaction.on_commit(add)
+
+
+def item_deleted(sender, instance, **kwargs):
+    """Remove item from index on commit of ``post_delete`` signal"""
+    kind = sender._meta.model_name
+    pk = instance.pk
+
+    def remove():
+        index.remove(kind, pk)
+        log_change(kind, pk)
+
+    transaction.on_commit(remove)
@@ -0,0 +1,113 @@
+"""Caching of catalog with cacheops.
+
+Querysets of albums and tracks of API views are cached with ``.cache()``.
+Cacheops invalidates them on save or delete of items, items inserted by
+bulk import are invalidated with ``invalidate_catalog()`` and items, which
+popularity counters are changed by ``update()`` or raw SQL, are
+invalidated with ``invalidate_counters()``.
+
+Hits and misses of cached reads of catalog are counted in Redis per model
+to see how much load is taken off the database.
+
+"""
+from django.contrib.postgres.search import SearchVectorField
+from django.db import transaction
+from django.db.models import DateTimeField, FileField, TextField
+
+from cacheops import invalidate_dict, invalidate_model
+from cacheops.redis import redis_client
+from redis.exceptions import RedisError
+
+from .models import Album, Track
+
+STATS_KEY = 'music_store:cache_stats'
+
+CACHED_MODELS = (Album, Track)
+
+# fields, which catalog is never filtered by exact value, they aren't
+# needed for invalidation
+NOT_FILTERED_FIELDS = (
+    DateTimeField, FileField, SearchVectorField, TextField,
+)
+
+
+def invalidate_catalog():
+    """Invalidate all cached querysets of albums and tracks"""
+    for model in CACHED_MODELS:
+        invalidate_model(model)
+
+
+def get_filtered_fields(model):
+    """Get names of columns of ``model``, which catalog can be filtered by"""
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if not isinstance(field, NOT_FILTERED_FIELDS)
+    ]
+
+
+def invalidate_counters(model, items, deltas):
+    """Invalidate cached querysets with items, which counters are changed.
+
+    Querysets, which matched both old and new values of counters, are
+    invalidated. Nothing is loaded from database: ``items`` are rows
+    returned by the update of counters itself. Invalidation is made on
+    commit, so querysets aren't cached again with old counters meanwhile.
+
+    Args:
+        model (MusicItem): model of items.
+        items (list): dicts with values of ``get_filtered_fields()`` of
+            changed items and new values of counters.
+        deltas (dict): item id -> dict counter name -> applied increase.
+
+    """
+    def invalidate():
+        for item in items:
+            invalidate_dict(model, item)
+            invalidate_dict(model, dict(item, **{
+                name: item[name] - delta
+                for name, delta in deltas[item['id']].items()
+            }))
+
+    transaction.on_commit(invalidate)
+
+
+def count_cache_read(sender, func=None, hit=False, **kwargs):
+    """Count hit or miss of cached read on ``cache_read`` signal"""
+    if sender not in CACHED_MODELS:
+        return
+    field = f'{sender._meta.model_name}:{"hits" if hit else "misses"}'
+    try:
+        redis_client.hincrby(STATS_KEY, field, 1)
+    except RedisError:
+        pass
+
+
+def get_cache_stats():
+    """Get statistics of cached reads of catalog.
+
+    Returns:
+        dict: model name -> numbers of ``hits``, ``misses`` and
+            ``hit_ratio``.
+
+    """
+    counters = {
+        field.decode(): int(value)
+        for field, value in redis_client.hgetall(STATS_KEY).items()
+    }
+    stats = {}
+    for model in CACHED_MODELS:
+        name = model._meta.model_name
+        hits = counters.get(f'{name}:hits', 0)
+        misses = counters.get(f'{name}:misses', 0)
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else None,
+        }
+    return stats
+
+
+def reset_cache_stats():
+    """Reset statistics of cached reads of catalog"""
+    redis_client.delete(STATS_KEY)
@@ -0,0 +1,103 @@
+from django.db import IntegrityError, transaction
+
+from .entitlements import Entitlements, grant
+from .exceptions import ItemAlreadyBought, PaymentNotFound
+from .models import BoughtAlbum, BoughtTrack, PaymentTransaction
+
+
+class Cart:
+    """Set of tracks and albums bought by user at once.
+
+    Whole cart is paid by a single payment transaction and checked out with
+    a constant number of queries regardless of its size: ownership is
+    validated with entitlements of user (see ``entitlements.py``), balance
+    is debited once and purchases are inserted with ``bulk_create``.
+
+    Attributes:
+        user (AppUser): buyer.
+        tracks (list): tracks to buy.
+        albums (list): albums to buy.
+
+    """
+
+    def __init__(self, user, tracks=(), albums=()):
+        self.user = user
+        self.tracks = list(tracks)
+        self.albums = list(albums)
+
+    @property
+    def total(self):
+        """int: total price of items in cart"""
+        return sum(item.price or 0 for item in self.tracks + self.albums)
+
+    def _bought_lists(self):
+        """Pairs of purchase model and items of corresponding type"""
+        return (
+            (BoughtTrack, self.tracks),
+            (BoughtAlbum, self.albums),
+        )
+
+    def has_bought_items(self):
+        """Check if any item of cart is already bought by user.
+
+        Tracks owned with their albums are bought too, as well as tracks
+        of albums in the cart.
+
+        """
+        album_ids = {album.pk for album in self.albums}
+        if any(track.album_id in album_ids for track in self.tracks):
+            return True
+        entitlements = Entitlements.for_user(self.user)
+        return bool(
+            entitlements.owned_tracks(self.tracks) or
+            entitlements.owned_albums(self.albums)
+        )
+
+    def checkout(self, payment_method=None):
+        """Buy all items of cart.
+
+        Returns:
+            PaymentTransaction: transaction which paid the cart.
+
+        Raises:
+            exceptions.ValidationError: User does not have enough money
+            exceptions.ValidationError: User don't have payment method
+            exceptions.ValidationError: Some item is already bought by user
+
+        """
+        payment_method = payment_method or self.user.default_payment
+
+        if payment_method is None:
+            raise PaymentNotFound
+
+        if self.has_bought_items():
+            raise ItemAlreadyBought
+
+        try:
+            with transaction.atomic():
+                payment = PaymentTransaction.debit(
+                    user=self.user,
+                    amount=self.total,
+                    payment_method=payment_method,
+                )
+                for bought_model, items in self._bought_lists():
+                    bought_model.objects.bulk_create(
+                        bought_model(
+                            user=self.user,
+                            item=item,
+                            transaction=payment,
+                        )
+                        for item in items
+                    )
+                    item_model = bought_model._meta.get_field('item') \
+                        .related_model
+                    item_model.shift_counters({
+                        item.pk: {'purchases_count': 1} for item in items
+                    })
+        except IntegrityError:
+            raise ItemAlreadyBought
+
+        # purchases are inserted in bulk, without signals
+        grant(self.user, self.tracks + self.albums)
+        self.user.refresh_from_db(fields=['balance'])
+        return payment
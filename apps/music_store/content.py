@@ -0,0 +1,95 @@
+import io
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+
+from .models import FREE_VERSION_LENGTH
+
+
+class PreviewReader:
+    """File-like wrapper of stream, which remembers its beginning.
+
+    Used to derive free version of track while its content is streamed into
+    storage, without reading the whole content into memory.
+
+    Attributes:
+        preview (str|bytes): first ``preview_size`` items of the stream.
+
+    """
+
+    def __init__(self, stream, preview_size):
+        self.stream = stream
+        self.preview_size = preview_size
+        self.preview = None
+        self.position = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        if self.preview is None:
+            self.preview = chunk[:self.preview_size]
+        elif len(self.preview) < self.preview_size:
+            self.preview += chunk[:self.preview_size - len(self.preview)]
+        self.position += len(chunk)
+        return chunk
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Storages rewind content before saving, allow only that"""
+        if offset or whence != io.SEEK_SET or self.position:
+            raise io.UnsupportedOperation('Stream can not be rewound')
+        return 0
+
+    def tell(self):
+        return self.position
+
+    @property
+    def closed(self):
+        return getattr(self.stream, 'closed', False)
+
+    def close(self):
+        self.stream.close()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return False
+
+    def seekable(self):
+        """Only rewinding of not read stream is allowed, see ``seek()``"""
+        return False
+
+
+def store_track_content(track, stream, name):
+    """Stream track content into the storage of ``Track.content_file``.
+
+    Content is written by chunks, free version of the track is derived from
+    the beginning of content. Track is not saved.
+
+    Args:
+        track (Track): track to store content for.
+        stream (file): readable file-like object with content.
+        name (str): original name of the content file.
+
+    """
+    reader = PreviewReader(stream, FREE_VERSION_LENGTH)
+    track.content_file.save(name, File(reader, name=name), save=False)
+
+    preview = reader.preview or ''
+    if isinstance(preview, bytes):
+        preview = preview.decode('utf-8', errors='ignore')
+    track.free_version = preview
+
+
+def open_track_content(track):
+    """Open full content of the track for reading.
+
+    Tracks created before content storage keep content in ``full_version``
+    field, it is served as a file too.
+
+    Returns:
+        File: opened file with track content.
+
+    """
+    if track.content_file:
+        return track.content_file.storage.open(track.content_file.name)
+    return ContentFile(track.full_version.encode())
@@ -0,0 +1,250 @@
+"""Resolver of ownership of tracks and albums.
+
+User owns a track if it's bought directly (``BoughtTrack``) or as a part
+of bought album (``BoughtAlbum`` and ``Track.album_id``), so album
+purchase is never expanded into rows per track.
+
+Ids of bought tracks and albums of user are kept in two Redis sets (sets
+of integers are stored by Redis as compact sorted arrays, which take
+memory proportional to number of purchases, unlike bitmaps, which take
+memory proportional to max id of track). Sets are populated lazily from
+database with a single query and expire after
+``MUSIC_STORE_ENTITLEMENTS_CACHE_TIMEOUT`` seconds. New purchases are
+added into sets when they are committed and sets are dropped when
+purchase is deleted (see ``apps.py``).
+
+Membership of any number of tracks is checked with one pipelined round
+trip to Redis. If Redis is unavailable, ownership is resolved from
+database.
+
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, Value
+
+from cacheops.redis import redis_client
+from redis.exceptions import RedisError
+
+from .models import Album, BoughtAlbum, BoughtTrack, Track
+
+TRACKS_KEY = 'music_store:entitlements:{user}:tracks'
+ALBUMS_KEY = 'music_store:entitlements:{user}:albums'
+
+# member of set of tracks, which marks that sets are populated
+POPULATED = 0
+
+
+class Entitlements:
+    """Tracks and albums owned by user"""
+
+    def __init__(self, user=None):
+        self.user = user
+        if user is not None:
+            self.tracks_key = TRACKS_KEY.format(user=user.pk)
+            self.albums_key = ALBUMS_KEY.format(user=user.pk)
+
+    @classmethod
+    def for_user(cls, user):
+        """Get entitlements of user, anonymous user owns nothing"""
+        if user is None or not user.is_authenticated:
+            return cls()
+        return cls(user)
+
+    def owns(self, item):
+        """Check if user owns the ``item`` (Track or Album)"""
+        if isinstance(item, Album):
+            return self.owns_album(item)
+        return self.owns_track(item)
+
+    def owns_track(self, track):
+        """Check if user owns the ``track`` (Track)"""
+        return track.pk in self.owned_tracks([track])
+
+    def owns_album(self, album):
+        """Check if user owns the ``album`` (Album)"""
+        return album.pk in self.owned_albums([album])
+
+    def owned_albums(self, albums):
+        """Get ids of ``albums`` owned by user.
+
+        Args:
+            albums (list): albums to check.
+
+        Returns:
+            set: ids of owned albums.
+
+        """
+        albums = list(albums)
+        if self.user is None or not albums:
+            return set()
+
+        def check(pipeline):
+            for album in albums:
+                pipeline.sismember(self.albums_key, album.pk)
+
+        def check_db():
+            owned = set(
+                BoughtAlbum.objects.filter(user=self.user, item__in=albums)
+                .values_list('item', flat=True)
+            )
+            return [album.pk in owned for album in albums]
+
+        flags = self._check_members(check, check_db)
+        return {album.pk for album, owned in zip(albums, flags) if owned}
+
+    def owned_tracks(self, tracks):
+        """Get ids of ``tracks`` owned by user.
+
+        Args:
+            tracks (list): tracks with ``album_id`` loaded.
+
+        Returns:
+            set: ids of owned tracks.
+
+        """
+        tracks = list(tracks)
+        if self.user is None or not tracks:
+            return set()
+
+        def check(pipeline):
+            for track in tracks:
+                pipeline.sismember(self.tracks_key, track.pk)
+                pipeline.sismember(self.albums_key, track.album_id or 0)
+
+        def check_db():
+            owned = set(
+                Track.objects.owned_by(self.user)
+                .filter(pk__in=[track.pk for track in tracks])
+                .values_list('pk', flat=True)
+            )
+            return [
+                flag
+                for track in tracks
+                for flag in (track.pk in owned, False)
+            ]
+
+        flags = self._check_members(check, check_db)
+        return {
+            track.pk
+            for track, by_track, by_album in zip(tracks, *[iter(flags)] * 2)
+            if by_track or by_album
+        }
+
+    def populate(self):
+        """Load ids of bought tracks and albums into Redis sets"""
+        ids = {'track': {POPULATED}, 'album': set()}
+        for kind, pk in _get_bought_ids(self.user):
+            ids[kind].add(pk)
+
+        timeout = settings.MUSIC_STORE_ENTITLEMENTS_CACHE_TIMEOUT
+        pipeline = redis_client.pipeline()
+        # purchases committed meanwhile may be in sets already, so sets are
+        # extended, not replaced
+        pipeline.sadd(self.tracks_key, *ids['track'])
+        pipeline.expire(self.tracks_key, timeout)
+        if ids['album']:
+            pipeline.sadd(self.albums_key, *ids['album'])
+            pipeline.expire(self.albums_key, timeout)
+        pipeline.execute()
+
+    def _check_members(self, check, check_db):
+        """Run membership checks in Redis or in database.
+
+        Args:
+            check (callable): adds checks into Redis pipeline.
+            check_db (callable): returns results of checks from database.
+
+        Returns:
+            list: results of checks.
+
+        """
+        try:
+            for attempt in range(2):
+                pipeline = redis_client.pipeline(transaction=False)
+                pipeline.sismember(self.tracks_key, POPULATED)
+                check(pipeline)
+                populated, *flags = pipeline.execute()
+                if populated:
+                    return flags
+                self.populate()
+        except RedisError:
+            pass
+        return check_db()
+
+
+def _get_bought_ids(user):
+    """Get ids of tracks and albums bought by user with a single query.
+
+    Returns:
+        QuerySet: pairs of type of item (``track`` or ``album``) and its id.
+
+    """
+    def bought(model, kind):
+        return model.objects.filter(user=user) \
+            .annotate(kind=Value(kind, output_field=CharField())) \
+            .values_list('kind', 'item')
+
+    return bought(BoughtTrack, 'track').union(
+        bought(BoughtAlbum, 'album'),
+        all=True,
+    )
+
+
+def grant(user, items):
+    """Add bought ``items`` into entitlements of user on commit.
+
+    Sets are dropped right away too, so until commit they are populated
+    from database, where purchase is visible for its own transaction only,
+    and nothing is granted if transaction is rolled back.
+
+    """
+    revoke_all(user)
+    tracks = [item.pk for item in items if isinstance(item, Track)]
+    albums = [item.pk for item in items if isinstance(item, Album)]
+
+    def add():
+        try:
+            pipeline = redis_client.pipeline()
+            if tracks:
+                pipeline.sadd(TRACKS_KEY.format(user=user.pk), *tracks)
+            if albums:
+                pipeline.sadd(ALBUMS_KEY.format(user=user.pk), *albums)
+            pipeline.execute()
+        except RedisError:
+            pass
+
+    transaction.on_commit(add)
+
+
+def revoke_all(user):
+    """Drop entitlements of user, they are populated again on demand"""
+    try:
+        redis_client.delete(
+            TRACKS_KEY.format(user=user.pk),
+            ALBUMS_KEY.format(user=user.pk),
+        )
+    except RedisError:
+        pass
+
+
+def purchase_saved(sender, instance, created, **kwargs):
+    """Grant bought item on ``post_save`` of purchase"""
+    if created:
+        grant(instance.user, [instance.item])
+
+
+def purchase_deleted(sender, instance, **kwargs):
+    """Drop entitlements on ``post_delete`` of purchase.
+
+    Sets are dropped right away and on commit, so they are never populated
+    with deleted purchase.
+
+    """
+    revoke_all(instance.user)
+    transaction.on_commit(lambda: revoke_all(instance.user))
+
+
+def user_created(sender, instance, created, **kwargs):
+    """Drop sets left by removed user with the same id (i.e. in tests)"""
+    if created:
+        revoke_all(instance)
@@ -92,13 +92,21 @@ class UserWithDefaultPaymentMethodFactory(UserFactory):
 
 
 class UserWithBalanceFactory(UserWithDefaultPaymentMethodFactory):
-    """Factory to create AppUser with balance."""
-    transactions = factory.RelatedFactory(
-        PaymentTransactionFactory,
-        'user',
-        amount=factory.SelfAttribute('user.balance'),
-        payment_method=factory.SelfAttribute('user.default_payment'),
-    )
+    """Factory to create AppUser with balance.
+
+    Balance is credited with a payment transaction, so it is consistent
+    with the ledger.
+
+    """
+
+    @factory.post_generation
+    def balance(self, create, extracted, **kwargs):
+        if create and extracted:
+            PaymentTransactionFactory(
+                user=self,
+                amount=extracted,
+                payment_method=self.default_payment,
+            )
 
 
 class BoughtTrackFactory(factory.DjangoModelFactory):
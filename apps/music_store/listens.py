@@ -0,0 +1,171 @@
+"""Write-behind buffer of track listens.
+
+Listens are appended to a Redis list on the request path and are written
+into database by ``flush_listens_buffer`` in batches: when the buffer has
+grown up to ``MUSIC_STORE_LISTENS_BATCH_SIZE`` and periodically by celery
+beat (``tasks.flush_listens``).
+
+Loss is bounded: the buffer never holds much more than
+``MUSIC_STORE_LISTENS_BUFFER_LIMIT`` listens, beyond that a batch is
+flushed right on the request path. If Redis is unavailable listens are
+written into database directly. A batch is removed from the buffer only
+after it is committed, so crash of flusher may duplicate at most one batch,
+but never loses it.
+
+Time of listen is buffered with it, so listens are dated by the moment
+they happened, not by the moment they are flushed (i.e. listens near
+midnight are rolled up into the right day).
+
+"""
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from cacheops.redis import redis_client
+from redis.exceptions import RedisError
+
+from .models import Album, ListenTrack, Track
+
+BUFFER_KEY = 'music_store:listens'
+FLUSH_LOCK_KEY = 'music_store:listens:flush'
+FLUSH_LOCK_TIMEOUT = 5 * 60
+
+# ``created`` is filled automatically on save, so listens with time of
+# event are inserted with raw SQL
+INSERT_LISTENS_SQL = """
+INSERT INTO {listen} (user_id, track_id, created, modified)
+SELECT user_id, track_id, created, created
+FROM UNNEST(%s::integer[], %s::integer[], %s::timestamptz[])
+    AS listen (user_id, track_id, created)
+"""
+
+
+def record_listen(user, track):
+    """Record that ``user`` listened to the ``track``.
+
+    If ``MUSIC_STORE_BUFFERED_LISTENS`` is disabled, listen is written into
+    database right away with ``Track.listen()``.
+
+    """
+    if not settings.MUSIC_STORE_BUFFERED_LISTENS:
+        track.listen(user)
+        return
+
+    try:
+        size = redis_client.rpush(
+            BUFFER_KEY,
+            f'{user.pk}:{track.pk}:{time.time()}',
+        )
+    except RedisError:
+        track.listen(user)
+        return
+
+    batch_size = settings.MUSIC_STORE_LISTENS_BATCH_SIZE
+    if size > settings.MUSIC_STORE_LISTENS_BUFFER_LIMIT:
+        # flusher falls behind, apply backpressure
+        flush_listens_buffer(max_batches=1)
+    elif size % batch_size == 0:
+        from .tasks import flush_listens
+        flush_listens.delay()
+
+
+def flush_listens_buffer(max_batches=None):
+    """Write buffered listens into database.
+
+    Only one flusher works at a time, call returns at once if buffer is
+    being flushed by someone else.
+
+    Args:
+        max_batches (int): max number of batches to write, by default
+            buffer is flushed until it is empty.
+
+    Returns:
+        int: number of written listens.
+
+    """
+    batch_size = settings.MUSIC_STORE_LISTENS_BATCH_SIZE
+    lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    written = batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            events = redis_client.lrange(BUFFER_KEY, 0, batch_size - 1)
+            if not events:
+                break
+            with transaction.atomic():
+                written += _write_listens(events)
+            redis_client.ltrim(BUFFER_KEY, len(events), -1)
+            batches += 1
+            if len(events) < batch_size:
+                break
+    finally:
+        lock.release()
+    return written
+
+
+def _write_listens(events):
+    """Insert listens of ``events`` and update popularity counters.
+
+    Events are ``user:track:timestamp`` strings, events buffered without
+    timestamp are dated by now. Listens of tracks or users removed since
+    the event are skipped.
+
+    Returns:
+        int: number of inserted listens.
+
+    """
+    now = timezone.now()
+    parsed = []
+    for event in events:
+        user_id, track_id, *timestamp = event.decode().split(':')
+        created = now
+        if timestamp:
+            created = datetime.fromtimestamp(float(timestamp[0]), timezone.utc)
+        parsed.append((int(user_id), int(track_id), created))
+
+    track_albums = dict(
+        Track.objects.filter(pk__in={e[1] for e in parsed})
+        .values_list('pk', 'album')
+    )
+    user_ids = set(
+        get_user_model().objects.filter(pk__in={e[0] for e in parsed})
+        .values_list('pk', flat=True)
+    )
+    listens = [
+        ListenTrack(user_id=user_id, track_id=track_id, created=created)
+        for user_id, track_id, created in parsed
+        if track_id in track_albums and user_id in user_ids
+    ]
+    if listens:
+        sql = INSERT_LISTENS_SQL.format(
+            listen=connection.ops.quote_name(ListenTrack._meta.db_table),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [
+                [listen.user_id for listen in listens],
+                [listen.track_id for listen in listens],
+                [listen.created for listen in listens],
+            ])
+
+    track_listens = Counter(listen.track_id for listen in listens)
+    album_listens = Counter()
+    for track_id, count in track_listens.items():
+        if track_albums[track_id]:
+            album_listens[track_albums[track_id]] += count
+    _add_listens(Track, track_listens)
+    _add_listens(Album, album_listens)
+    return len(listens)
+
+
+def _add_listens(model, listens):
+    """Increase ``listens_count`` of items by ``listens`` (id -> count)"""
+    model.shift_counters({
+        pk: {'listens_count': count} for pk, count in listens.items()
+    })
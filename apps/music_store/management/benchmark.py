@@ -0,0 +1,37 @@
+"""Helpers of benchmark commands.
+
+Benchmarks create their own synthetic data and remove it afterwards, but
+they still write into the configured database and storage, so never run
+them against production.
+
+"""
+from apps.music_store import autocomplete
+from apps.music_store.caching import invalidate_catalog
+
+
+def percentile(latencies, p):
+    """Get ``p`` percentile (0..1) of sorted ``latencies``"""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+
+def format_latencies(latencies):
+    """Format p50, p99 and max of ``latencies`` (in seconds) in ms"""
+    latencies = sorted(latencies)
+    return (
+        f'p50 {percentile(latencies, 0.5) * 1000:.1f}ms, '
+        f'p99 {percentile(latencies, 0.99) * 1000:.1f}ms, '
+        f'max {latencies[-1] * 1000:.1f}ms'
+    )
+
+
+def delete_synthetic(queryset):
+    """Delete synthetic items of ``queryset`` with a single query.
+
+    Items are deleted without collecting them and sending signals, as
+    benchmarks create millions of them, so caches of catalog and indexes of
+    autocomplete are reset as after bulk import.
+
+    """
+    queryset._raw_delete(queryset.db)
+    invalidate_catalog()
+    autocomplete.reset()
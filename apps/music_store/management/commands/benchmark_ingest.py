@@ -0,0 +1,72 @@
+import time
+import zipfile
+from tempfile import TemporaryFile
+
+from django.core.management.base import BaseCommand
+
+from apps.music_store.models import Album, Track
+from apps.music_store.utils import AlbumUploader
+
+
+class Command(BaseCommand):
+    """Benchmark of zip archive ingestion
+
+    Builds synthetic archive with ``--albums`` album folders and ``--tracks``
+    tracks spread over them, ingests it with bulk or entry by entry handler
+    and reports throughput in tracks per second.
+
+    Created albums, tracks and their content files are removed afterwards
+    (see ``management/benchmark.py``).
+
+    """
+    help = 'Measure throughput of zip archive ingestion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tracks', type=int, default=10000)
+        parser.add_argument('--albums', type=int, default=100)
+        parser.add_argument('--content-size', type=int, default=1024)
+        parser.add_argument(
+            '--mode',
+            choices=('bulk', 'single'),
+            default='bulk',
+        )
+
+    def handle(self, *args, **options):
+        uploader = AlbumUploader()
+        try:
+            with TemporaryFile() as archive:
+                self._build_archive(archive, options)
+                with zipfile.ZipFile(archive) as zip_file:
+                    started = time.perf_counter()
+                    if options['mode'] == 'bulk':
+                        uploader.bulk_zip_album_handler(zip_file)
+                    else:
+                        uploader.zip_album_handler(zip_file)
+                    elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f'{options["tracks"]} tracks ingested in {elapsed:.2f}s, '
+                f'{options["tracks"] / elapsed:.0f} tracks/sec'
+            )
+        finally:
+            # partially ingested archive is removed too
+            self._cleanup()
+
+    def _build_archive(self, archive, options):
+        """Write synthetic archive into ``archive`` file"""
+        content = b'x' * options['content_size']
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            for i in range(options['tracks']):
+                album = i % options['albums']
+                zip_file.writestr(
+                    f'benchmark - album {album}/track {i}.txt',
+                    content,
+                )
+
+    def _cleanup(self):
+        """Remove ingested albums, tracks and content files"""
+        tracks = Track.objects.filter(author='benchmark')
+        for track in tracks.only('content_file').iterator():
+            track.content_file.delete(save=False)
+        tracks.delete()
+        Album.objects.filter(author='benchmark').delete()
@@ -0,0 +1,113 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+
+from apps.music_store.management.benchmark import format_latencies
+from apps.music_store.models import (
+    BoughtTrack,
+    PaymentMethod,
+    PaymentTransaction,
+    Track,
+)
+
+
+class Command(BaseCommand):
+    """Benchmark of parallel purchases
+
+    Fires ``--buys`` concurrent purchases of ``--tracks`` tracks by a single
+    user, whose balance is enough only for half of the tracks, and checks
+    that there was no double spend:
+
+        * balance isn't negative and is equal to the ledger total
+        * each track is bought at most once
+        * spent money matches bought tracks
+
+    Latency percentiles of ``MusicItem.buy()`` are reported.
+
+    Creates its own user and tracks and removes them afterwards (see
+    ``management/benchmark.py``).
+
+    """
+    help = 'Fire concurrent purchases and check there is no double spend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buys', type=int, default=200)
+        parser.add_argument('--tracks', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=20)
+        parser.add_argument('--price', type=int, default=10)
+
+    def handle(self, *args, **options):
+        price = options['price']
+        user = get_user_model().objects.create(
+            username='benchmark_purchases',
+            email='benchmark_purchases@example.com',
+        )
+        payment_method = PaymentMethod.objects.create(
+            owner=user,
+            title='benchmark',
+            is_default=True,
+        )
+        initial_balance = price * (options['tracks'] // 2)
+        PaymentTransaction.objects.create(
+            user=user,
+            amount=initial_balance,
+            payment_method=payment_method,
+        )
+        tracks = [
+            Track.objects.create(
+                title=f'benchmark {i}',
+                price=price,
+                full_version='benchmark',
+            )
+            for i in range(options['tracks'])
+        ]
+
+        def buy(i):
+            # every worker acts like a separate request with own user copy
+            buyer = get_user_model().objects.get(pk=user.pk)
+            started = time.perf_counter()
+            try:
+                tracks[i % len(tracks)].buy(buyer, payment_method)
+            except ValidationError:
+                pass
+            finally:
+                connection.close()
+            return time.perf_counter() - started
+
+        try:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                latencies = list(pool.map(buy, range(options['buys'])))
+            self._report(user, initial_balance, price, latencies)
+        finally:
+            BoughtTrack.objects.filter(user=user).delete()
+            Track.objects.filter(pk__in=[t.pk for t in tracks]).delete()
+            PaymentTransaction.objects.filter(user=user).delete()
+            user.delete()
+
+    def _report(self, user, initial_balance, price, latencies):
+        """Check consistency of balance and print latency percentiles"""
+        user.refresh_from_db(fields=['balance'])
+        ledger = PaymentTransaction.objects.filter(user=user) \
+            .aggregate(total=Sum('amount'))['total']
+        bought = BoughtTrack.objects.filter(user=user).count()
+        spent = initial_balance - user.balance
+
+        self.stdout.write(f'Bought tracks: {bought}, spent: {spent}')
+        consistent = (
+            user.balance >= 0 and
+            user.balance == ledger and
+            spent == bought * price
+        )
+        if consistent:
+            self.stdout.write(self.style.SUCCESS('No double spend'))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f'Double spend: balance {user.balance}, ledger {ledger}'
+            ))
+
+        self.stdout.write(f'Latency {format_latencies(latencies)}')
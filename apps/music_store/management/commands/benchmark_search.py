@@ -0,0 +1,98 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.music_store.management.benchmark import (
+    delete_synthetic,
+    format_latencies,
+)
+from apps.music_store.models import Track
+from apps.music_store.search import search_items
+
+WORDS = (
+    'love', 'night', 'dance', 'heart', 'fire', 'blue', 'rain', 'summer',
+    'dream', 'road', 'light', 'shadow', 'river', 'moon', 'city', 'gold',
+    'wild', 'storm', 'echo', 'silver', 'ocean', 'ghost', 'star', 'winter',
+)
+
+
+class Command(BaseCommand):
+    """Benchmark of global search
+
+    Fills catalog with ``--tracks`` synthetic tracks (1M by default) with
+    titles and authors made of random words, then runs ``--queries``
+    searches of whole words, prefixes, substrings and misspelled words and
+    reports latency percentiles per kind of query.
+
+    Created tracks are removed afterwards (see ``management/benchmark.py``).
+
+    """
+    help = 'Measure latency of global search over synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tracks', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep synthetic tracks for next runs')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        queries = {
+            'word': lambda word: word,
+            'prefix': lambda word: word[:3],
+            'substring': lambda word: word[1:-1],
+            'two words': lambda word: f'{word} {random.choice(WORDS)}',
+            'misspelled': lambda word: f'{word[:-1]}x',
+        }
+        try:
+            if not Track.objects.filter(
+                author__startswith='benchmark',
+            ).exists():
+                self._fill_catalog(options)
+            for kind, make_query in queries.items():
+                self._report(kind, [
+                    self._search(make_query(random.choice(WORDS)), options)
+                    for i in range(options['queries'])
+                ])
+        finally:
+            if not options['keep']:
+                delete_synthetic(
+                    Track.objects.filter(author__startswith='benchmark'),
+                )
+
+    def _fill_catalog(self, options):
+        """Create synthetic tracks by batches"""
+        started = time.perf_counter()
+        created = 0
+        while created < options['tracks']:
+            size = min(options['batch_size'], options['tracks'] - created)
+            Track.objects.bulk_create(
+                Track(
+                    title=' '.join(random.sample(WORDS, 3)),
+                    author=f'benchmark {random.choice(WORDS)}',
+                    full_version='benchmark',
+                )
+                for i in range(size)
+            )
+            created += size
+        self.stdout.write(
+            f'{created} tracks created in '
+            f'{time.perf_counter() - started:.1f}s'
+        )
+
+    def _search(self, query, options):
+        """Get latency of search of the first page of tracks"""
+        started = time.perf_counter()
+        search_items(
+            Track.objects.without_content(),
+            query,
+            slice(0, options['limit']),
+        )
+        return time.perf_counter() - started
+
+    def _report(self, kind, latencies):
+        """Print latency percentiles of kind of queries"""
+        self.stdout.write(f'{kind}: {format_latencies(latencies)}')
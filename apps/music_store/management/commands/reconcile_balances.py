@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from apps.music_store.models import PaymentTransaction
+
+
+class Command(BaseCommand):
+    """Reconcile users' balances with the ledger of payment transactions
+
+    Balance is maintained incrementally on each payment transaction, this
+    command re-aggregates the whole ledger with a single grouped query and
+    reports users whose balance drifted from it.
+
+    Usage:
+        manage.py reconcile_balances         # report drift only
+        manage.py reconcile_balances --fix   # overwrite drifted balances
+
+    """
+    help = 'Detect (and optionally fix) drift of users balances from ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            dest='fix',
+            default=False,
+            help='Overwrite drifted balances with the ledger total',
+        )
+
+    def handle(self, *args, **options):
+        ledger = dict(
+            PaymentTransaction.objects.order_by()
+            .values('user')
+            .annotate(total=Sum('amount'))
+            .values_list('user', 'total')
+        )
+
+        drifted = 0
+        users = get_user_model().objects.only('pk', 'balance').iterator()
+        for user in users:
+            expected = ledger.get(user.pk) or 0
+            if user.balance == expected:
+                continue
+
+            drifted += 1
+            self.stdout.write(
+                f'{user.pk}: balance {user.balance}, ledger {expected}'
+            )
+            if options['fix']:
+                get_user_model().objects.filter(pk=user.pk).update(
+                    balance=expected,
+                )
+
+        self.stdout.write(f'Users with drifted balance: {drifted}')
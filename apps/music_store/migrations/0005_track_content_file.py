@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.8 on 2018-05-07 03:12
+from __future__ import unicode_literals
+
+import apps.music_store.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music_store', '0004_auto_20180419_0626'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='content_file',
+            field=models.FileField(blank=True, upload_to=apps.music_store.models.upload_track_content_to, verbose_name='content file'),
+        ),
+        migrations.AlterField(
+            model_name='track',
+            name='full_version',
+            field=models.TextField(blank=True, verbose_name='full version'),
+        ),
+    ]
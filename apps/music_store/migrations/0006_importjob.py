@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.8 on 2018-05-10 04:41
+from __future__ import unicode_literals
+
+import apps.music_store.models
+import django.contrib.postgres.fields
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music_store', '0005_track_content_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('file', models.FileField(upload_to=apps.music_store.models.upload_import_to, verbose_name='file')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='status')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='total entries')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='processed entries')),
+                ('shard_offsets', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), default=list, size=None, verbose_name='shard offsets')),
+                ('stats', django.contrib.postgres.fields.jsonb.JSONField(default=dict, verbose_name='statistics')),
+                ('errors', django.contrib.postgres.fields.jsonb.JSONField(default=list, verbose_name='errors')),
+            ],
+            options={
+                'verbose_name': 'Import job',
+                'verbose_name_plural': 'Import jobs',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.8 on 2018-05-14 04:21
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+FILL_COUNTERS = """
+UPDATE music_store_track AS track SET
+    likes_count = (
+        SELECT COUNT(*) FROM music_store_liketrack
+        WHERE track_id = track.id
+    ),
+    listens_count = (
+        SELECT COUNT(*) FROM music_store_listentrack
+        WHERE track_id = track.id
+    ),
+    purchases_count = (
+        SELECT COUNT(*) FROM music_store_boughttrack
+        WHERE item_id = track.id
+    );
+
+UPDATE music_store_album AS album SET
+    likes_count = (
+        SELECT COALESCE(SUM(likes_count), 0) FROM music_store_track
+        WHERE album_id = album.id
+    ),
+    listens_count = (
+        SELECT COALESCE(SUM(listens_count), 0) FROM music_store_track
+        WHERE album_id = album.id
+    ),
+    purchases_count = (
+        SELECT COUNT(*) FROM music_store_boughtalbum
+        WHERE item_id = album.id
+    );
+"""
+
+
+def counter(verbose_name):
+    return models.PositiveIntegerField(
+        db_index=True,
+        default=0,
+        editable=False,
+        verbose_name=verbose_name,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music_store', '0006_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='album',
+            name='likes_count',
+            field=counter('likes'),
+        ),
+        migrations.AddField(
+            model_name='album',
+            name='listens_count',
+            field=counter('listens'),
+        ),
+        migrations.AddField(
+            model_name='album',
+            name='purchases_count',
+            field=counter('purchases'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='likes_count',
+            field=counter('likes'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='listens_count',
+            field=counter('listens'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='purchases_count',
+            field=counter('purchases'),
+        ),
+        migrations.RunSQL(FILL_COUNTERS, migrations.RunSQL.noop),
+    ]
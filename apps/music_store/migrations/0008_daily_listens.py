@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.8 on 2018-05-16 05:02
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('music_store', '0007_popularity_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackDailyListens',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='day')),
+                ('count', models.PositiveIntegerField(verbose_name='listens')),
+                ('track', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_listens', to='music_store.Track', verbose_name='track')),
+            ],
+            options={
+                'verbose_name': 'Daily listens of track',
+                'verbose_name_plural': 'Daily listens of tracks',
+                'ordering': ('-day',),
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserDailyListens',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='day')),
+                ('count', models.PositiveIntegerField(verbose_name='listens')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_listens', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'Daily listens of user',
+                'verbose_name_plural': 'Daily listens of users',
+                'ordering': ('-day',),
+                'abstract': False,
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='trackdailylistens',
+            unique_together=set([('track', 'day')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userdailylistens',
+            unique_together=set([('user', 'day')]),
+        ),
+    ]
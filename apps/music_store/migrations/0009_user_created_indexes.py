@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.8 on 2018-05-18 03:47
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('music_store', '0008_daily_listens'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='liketrack',
+            index=models.Index(fields=['user', 'created'], name='liketrack_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='listentrack',
+            index=models.Index(fields=['user', 'created'], name='listentrack_user_created'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.8 on 2018-05-21 06:15
+from __future__ import unicode_literals
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION music_store_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(NEW.author, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER music_store_track_search_vector
+    BEFORE INSERT OR UPDATE OF title, author ON music_store_track
+    FOR EACH ROW EXECUTE PROCEDURE music_store_search_vector();
+
+CREATE TRIGGER music_store_album_search_vector
+    BEFORE INSERT OR UPDATE OF title, author ON music_store_album
+    FOR EACH ROW EXECUTE PROCEDURE music_store_search_vector();
+
+UPDATE music_store_track SET title = title;
+UPDATE music_store_album SET title = title;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER music_store_track_search_vector ON music_store_track;
+DROP TRIGGER music_store_album_search_vector ON music_store_album;
+DROP FUNCTION music_store_search_vector();
+"""
+
+# ``icontains`` lookups are compiled into ``UPPER(column::text) LIKE``,
+# so trigram indexes are built over the same expressions
+TRIGRAM_INDEXES = """
+CREATE INDEX track_title_trgm ON music_store_track
+    USING gin (UPPER(title::text) gin_trgm_ops);
+CREATE INDEX track_author_trgm ON music_store_track
+    USING gin (UPPER(author::text) gin_trgm_ops);
+CREATE INDEX album_title_trgm ON music_store_album
+    USING gin (UPPER(title::text) gin_trgm_ops);
+CREATE INDEX album_author_trgm ON music_store_album
+    USING gin (UPPER(author::text) gin_trgm_ops);
+"""
+
+DROP_TRIGRAM_INDEXES = """
+DROP INDEX track_title_trgm;
+DROP INDEX track_author_trgm;
+DROP INDEX album_title_trgm;
+DROP INDEX album_author_trgm;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music_store', '0009_user_created_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='album',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='search vector'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='search vector'),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='album_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='track_search_vector'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+        migrations.RunSQL(TRIGRAM_INDEXES, DROP_TRIGRAM_INDEXES),
+    ]
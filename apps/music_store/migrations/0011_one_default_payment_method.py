@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.8 on 2018-05-22 03:47
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# the latest default method of owner is kept, if there are several of them
+UNSET_EXTRA_DEFAULTS = """
+UPDATE music_store_paymentmethod AS method SET is_default = FALSE
+WHERE is_default AND EXISTS (
+    SELECT 1 FROM music_store_paymentmethod AS other
+    WHERE other.owner_id = method.owner_id
+        AND other.is_default
+        AND other.id > method.id
+);
+"""
+
+# partial unique index, which is checked at the end of statement, so
+# default is switched by single UPDATE (see ``PaymentMethod.set_default``)
+ONE_DEFAULT_CONSTRAINT = """
+ALTER TABLE music_store_paymentmethod
+    ADD CONSTRAINT music_store_paymentmethod_one_default
+    EXCLUDE USING btree (owner_id WITH =) WHERE (is_default)
+    DEFERRABLE INITIALLY IMMEDIATE;
+"""
+
+DROP_ONE_DEFAULT_CONSTRAINT = """
+ALTER TABLE music_store_paymentmethod
+    DROP CONSTRAINT music_store_paymentmethod_one_default;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music_store', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(UNSET_EXTRA_DEFAULTS, migrations.RunSQL.noop),
+        migrations.RunSQL(ONE_DEFAULT_CONSTRAINT, DROP_ONE_DEFAULT_CONSTRAINT),
+    ]
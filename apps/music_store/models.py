@@ -1,12 +1,80 @@
+from datetime import timedelta
+
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Sum
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django_extensions.db.models import TimeStampedModel, TitleDescriptionModel
 
 from apps.music_store.exceptions import PaymentNotFound, NotEnoughMoney, \
     ItemAlreadyBought
+from libs.utils import get_random_filename
+
+# length of free version of track derived from its content
+FREE_VERSION_LENGTH = 25
+
+# like or unlike of track (``change``) and update of likes counters of the
+# track and its album, if like is changed, all in one statement (counters
+# never drop below zero, even if they drifted)
+CHANGE_LIKES_SQL = """
+WITH changed AS ({change}),
+changed_track AS (
+    UPDATE {track} SET likes_count = GREATEST(likes_count + %(delta)s, 0)
+    WHERE id IN (SELECT track_id FROM changed)
+    RETURNING {track_fields}
+),
+changed_album AS (
+    UPDATE {album} SET likes_count = GREATEST(likes_count + %(delta)s, 0)
+    WHERE id IN (SELECT album_id FROM changed_track)
+    RETURNING {album_fields}
+)
+SELECT
+    (SELECT row_to_json(changed_track) FROM changed_track),
+    (SELECT row_to_json(changed_album) FROM changed_album)
+"""
+LIKE_SQL = """
+    INSERT INTO {like} (track_id, user_id, created, modified)
+    VALUES (%(track)s, %(user)s, NOW(), NOW())
+    ON CONFLICT (track_id, user_id) DO NOTHING
+    RETURNING track_id
+"""
+UNLIKE_SQL = """
+    DELETE FROM {like} WHERE track_id = %(track)s AND user_id = %(user)s
+    RETURNING track_id
+"""
+# shift of popularity counters of items by deltas given per item
+SHIFT_COUNTERS_SQL = """
+UPDATE {table} AS item SET {assignments}
+FROM UNNEST({arrays}) AS delta (id, {counters})
+WHERE item.id = delta.id
+RETURNING {fields}
+"""
+
+
+def upload_import_to(instance, filename):
+    """Upload archives for import to this folder.
+
+    Returns:
+        String. Generated path for archive.
+
+    """
+    return f'imports/{get_random_filename(filename)}'
+
+
+def upload_track_content_to(instance, filename):
+    """Upload content of tracks to this folder.
+
+    Returns:
+        String. Generated path for content file.
+
+    """
+    return f'tracks/{get_random_filename(filename)}'
 
 
 class PaymentMethod(models.Model):
@@ -30,15 +98,69 @@ class PaymentMethod(models.Model):
         return f'{self.owner}\'s method {self.title}'
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        """Save method and keep ``AppUser.default_payment_method`` in sync.
+
+        At most one method of owner is default (see migration
+        ``0011_one_default_payment_method``), so other default method is
+        unset before this one is saved.
+
+        """
+        adding = self._state.adding
+        with transaction.atomic():
+            if self.is_default:
+                self._lock_owner()
+                default_methods = PaymentMethod.objects.filter(
+                    owner_id=self.owner_id,
+                    is_default=True,
+                )
+                default_methods.exclude(pk=self.pk).update(is_default=False)
+            super().save(*args, **kwargs)
+            # new method which is not default can't be default of owner
+            if self.is_default or not adding:
+                self._set_owner_default()
+
+    def set_default(self):
+        """Make method default one of its owner.
+
+        Default is switched by a single UPDATE, constraint of single default
+        is checked at the end of statement.
+
+        """
+        with transaction.atomic():
+            self._lock_owner()
+            PaymentMethod.objects.filter(
+                Q(is_default=True) | Q(pk=self.pk),
+                owner_id=self.owner_id,
+            ).update(is_default=Case(
+                When(pk=self.pk, then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ))
+            self.is_default = True
+            self._set_owner_default()
+
+    def _lock_owner(self):
+        """Lock owner till the end of transaction.
+
+        Switches of default method of the same owner are serialized, so
+        they never see each other's uncommitted default and violate the
+        constraint of single default.
+
+        """
+        owners = get_user_model().objects.select_for_update()
+        list(owners.filter(pk=self.owner_id).values_list('pk'))
 
-        # if this method is default, set all other methods not default
+    def _set_owner_default(self):
+        """Set ``AppUser.default_payment_method`` of owner"""
+        owners = get_user_model().objects.filter(pk=self.owner_id)
         if self.is_default:
-            default_methods = PaymentMethod.objects.filter(
-                owner=self.owner,
-                is_default=True,
-            )
-            default_methods.exclude(pk=self.pk).update(is_default=False)
+            default = self
+        else:
+            owners = owners.filter(default_payment_method=self)
+            default = None
+
+        if owners.update(default_payment_method=default):
+            self.owner.default_payment_method = default
 
 
 class PaymentTransaction(TimeStampedModel):
@@ -68,7 +190,13 @@ class PaymentTransaction(TimeStampedModel):
         return f'{self.user} received {self.amount}'
 
     def update_user_balance(self, user):
-        """ Method for update user balance """
+        """Recalculate user balance by aggregating the whole ledger.
+
+        Cost grows with the number of user's transactions, so it is used
+        only for reconciliation (see ``reconcile_balances`` command) and
+        when ``MUSIC_STORE_INCREMENTAL_BALANCE`` is disabled.
+
+        """
         total_balance = self.__class__.objects.filter(user=user) \
             .aggregate(total_amount=Sum('amount')) \
             .get('total_amount')
@@ -77,12 +205,66 @@ class PaymentTransaction(TimeStampedModel):
         user.save(update_fields=['balance'])
         user.refresh_from_db()
 
-    def save(self, **kwargs):
+    def apply_to_user_balance(self, user):
+        """Shift user balance by the transaction amount.
+
+        Balance is changed with a single atomic
+        ``UPDATE ... SET balance = balance + amount`` so it doesn't depend on
+        size of the ledger and is safe for concurrent transactions.
+
+        """
+        user.__class__.objects.filter(pk=user.pk).update(
+            balance=F('balance') + self.amount,
+        )
+        user.refresh_from_db(fields=['balance'])
+
+    @classmethod
+    def debit(cls, user, amount, payment_method=None):
+        """Charge ``amount`` from user balance and record it in the ledger.
+
+        Balance is checked and decreased with a single conditional
+        ``UPDATE ... WHERE balance >= amount``. It locks user's row till the
+        end of the surrounding transaction, so parallel purchases can't
+        overdraw the balance. Must be called inside ``transaction.atomic()``.
+
+        Raises:
+            NotEnoughMoney: user balance is less than ``amount``
+
+        """
+        charged = user.__class__.objects.filter(
+            pk=user.pk,
+            balance__gte=amount,
+        ).update(balance=F('balance') - amount)
+        if not charged:
+            raise NotEnoughMoney
+
+        payment = cls(user=user, amount=-amount, payment_method=payment_method)
+        payment.save(update_balance=False)
+        return payment
+
+    def save(self, update_balance=True, **kwargs):
+        """Save transaction and apply it to user balance.
+
+        Args:
+            update_balance (bool): if False, user balance is left untouched,
+                i.e. it is already changed by caller (see ``debit()``).
+
+        """
+        if not update_balance:
+            return super().save(**kwargs)
+
         if self.amount < 0 and self.user.balance < abs(self.amount):
             raise NotEnoughMoney
 
-        super().save(**kwargs)
-        self.update_user_balance(self.user)
+        is_new = self.pk is None
+        with transaction.atomic():
+            super().save(**kwargs)
+            # only new transactions can be applied incrementally, changed
+            # ones require full recalculation
+            if settings.MUSIC_STORE_INCREMENTAL_BALANCE and is_new:
+                self.apply_to_user_balance(self.user)
+            else:
+                self.update_user_balance(self.user)
 
 
 class MusicItem(TitleDescriptionModel, TimeStampedModel):
@@ -92,6 +274,15 @@ class MusicItem(TitleDescriptionModel, TimeStampedModel):
         title (str): text representation of items's title.
         author (str): text representation of author's name.
         price (int): price of item. Minimal price is 0.
+        likes_count (int): number of likes of item (of its tracks).
+        listens_count (int): number of listens of item (of its tracks).
+        purchases_count (int): number of purchases of item.
+        search_vector (tsvector): full text search document of title and
+            author, maintained by database trigger (see ``search.py``).
+
+    Popularity counters are maintained incrementally on like, listen and
+    purchase and are reconciled periodically
+    (see ``tasks.reconcile_popularity_counters``).
 
     """
     author = models.CharField(
@@ -108,6 +299,31 @@ class MusicItem(TitleDescriptionModel, TimeStampedModel):
         null=True,
     )
 
+    likes_count = models.PositiveIntegerField(
+        verbose_name=_('likes'),
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+    listens_count = models.PositiveIntegerField(
+        verbose_name=_('listens'),
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+    purchases_count = models.PositiveIntegerField(
+        verbose_name=_('purchases'),
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+
+    search_vector = SearchVectorField(
+        verbose_name=_('search vector'),
+        null=True,
+        editable=False,
+    )
+
     class Meta:
         abstract = True
         ordering = ('created',)
@@ -124,21 +340,79 @@ class MusicItem(TitleDescriptionModel, TimeStampedModel):
         }
         return types.get(self.__class__)
 
+    def update_counters(self, **deltas):
+        """Shift popularity counters of the item by ``deltas`` atomically.
+
+        Counters of the instance itself are not refreshed.
+
+        Args:
+            deltas (dict): counter name -> value to add.
+
+        """
+        self.__class__.shift_counters({self.pk: deltas})
+
+    @classmethod
+    def shift_counters(cls, deltas):
+        """Shift popularity counters of items with a single query.
+
+        Cached querysets with changed items are invalidated from the rows
+        returned by the update, no extra query is made.
+
+        Args:
+            deltas (dict): item id -> dict counter name -> value to add.
+
+        """
+        from .caching import get_filtered_fields, invalidate_counters
+        if not deltas:
+            return
+        quote_name = connection.ops.quote_name
+        counters = sorted({name for item in deltas.values() for name in item})
+        fields = get_filtered_fields(cls)
+        sql = SHIFT_COUNTERS_SQL.format(
+            table=quote_name(cls._meta.db_table),
+            assignments=', '.join(
+                f'{quote_name(name)} = '
+                f'item.{quote_name(name)} + delta.{quote_name(name)}'
+                for name in counters
+            ),
+            arrays=', '.join(['%s::integer[]'] * (len(counters) + 1)),
+            counters=', '.join(quote_name(name) for name in counters),
+            fields=', '.join(f'item.{quote_name(name)}' for name in fields),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [list(deltas)] + [
+                [deltas[pk].get(name, 0) for pk in deltas]
+                for name in counters
+            ])
+            items = [dict(zip(fields, row)) for row in cursor.fetchall()]
+        invalidate_counters(cls, items, deltas)
+
     def is_bought(self, user):
-        """Check if the track is bought by some user.
+        """Check if the item is bought by user.
+
+        Ownership is resolved with entitlements of user cached in Redis (see
+        ``entitlements.py``).
 
         Args:
-            user (AppUser): probable owner of track.
+            user (AppUser): probable owner of item.
 
         """
-        return self.bought_model.objects.filter(user=user, item=self).exists()
+        from .entitlements import Entitlements
+        return Entitlements.for_user(user).owns(self)
 
     def buy(self, user, payment_method=None):
         """ Method for buy this item
 
+        Debit of balance, ledger record and purchase record are written in
+        one atomic block. Balance is checked by conditional update (see
+        ``PaymentTransaction.debit``) and duplicated purchase is caught by
+        unique constraint, so parallel purchases are safe.
+
         Raises:
             exceptions.ValidationError: User does not have enough money
             exceptions.ValidationError: User don't have payment method
+            exceptions.ValidationError: Item is already bought by user
+                (or track is bought with its album)
         """
 
         payment_method = payment_method or user.default_payment
@@ -146,22 +420,51 @@ class MusicItem(TitleDescriptionModel, TimeStampedModel):
         if payment_method is None:
             raise PaymentNotFound
 
-        if user.balance < self.price:
-            raise NotEnoughMoney
+        # track may be owned with its album
+        if self.is_bought(user):
+            raise ItemAlreadyBought
 
-        if self.bought_model.objects.filter(user=user, item=self).exists():
+        try:
+            with transaction.atomic():
+                payment = PaymentTransaction.debit(
+                    user=user,
+                    amount=self.price or 0,
+                    payment_method=payment_method,
+                )
+                # item is added into entitlements of user on commit
+                self.bought_model.objects.create(
+                    user=user,
+                    item=self,
+                    transaction=payment,
+                )
+                self.update_counters(purchases_count=1)
+        except IntegrityError:
             raise ItemAlreadyBought
 
-        transaction = PaymentTransaction.objects.create(
-            user=user,
-            amount=-self.price,
-            payment_method=payment_method,
-        )
-        self.bought_model.objects.create(
-            user=user,
-            item=self,
-            transaction=transaction,
-        )
+        user.refresh_from_db(fields=['balance'])
+
+
+class AlbumQuerySet(models.QuerySet):
+    """Custom queryset for Album model"""
+
+    def with_track_ids(self, cache=False):
+        """Albums with prefetched ids of their tracks.
+
+        Only ids of tracks are loaded, without their content.
+
+        Args:
+            cache (bool): cache albums and ids of their tracks with
+                cacheops.
+
+        """
+        tracks = Track.objects.only('id', 'album')
+        albums = self
+        if cache:
+            tracks, albums = tracks.cache(), self.cache()
+        return albums.prefetch_related(models.Prefetch(
+            'tracks',
+            queryset=tracks,
+        ))
 
 
 class Album(MusicItem):
@@ -182,7 +485,12 @@ class Album(MusicItem):
         max_length=200
     )
 
+    objects = AlbumQuerySet.as_manager()
+
     class Meta(MusicItem.Meta):
+        indexes = [
+            GinIndex(fields=['search_vector'], name='album_search_vector'),
+        ]
         verbose_name = _('Music Album')
         verbose_name_plural = _('Music Albums')
 
@@ -192,14 +500,108 @@ class Album(MusicItem):
         return not self.tracks.exists()
 
 
+class TrackQuerySet(models.QuerySet):
+    """Custom queryset for Track model"""
+
+    def owned_by(self, user):
+        """Tracks bought by user directly or as a part of bought album.
+
+        Args:
+            user (AppUser): probable owner of tracks.
+
+        """
+        return self.filter(
+            Q(purchased__user=user) | Q(album__purchased__user=user)
+        ).distinct()
+
+    def without_content(self):
+        """Tracks without unbounded ``full_version`` field loaded.
+
+        Use ``full_versions()`` to load content for owned tracks only.
+
+        """
+        return self.defer('full_version')
+
+    def full_versions(self, ids):
+        """Get full versions of tracks with ``ids`` in one query.
+
+        Content of tracks stored in ``content_file`` isn't loaded.
+
+        Returns:
+            dict: track id -> full version or None if content is stored in
+                ``content_file``.
+
+        """
+        if not ids:
+            return {}
+        rows = self.filter(pk__in=ids) \
+            .values_list('pk', 'full_version', 'content_file')
+        return {
+            pk: None if content_file else full_version
+            for pk, full_version, content_file in rows
+        }
+
+    def statuses(self, user, ids):
+        """Get like, ownership and listens status of tracks for user.
+
+        Each relation is resolved with a single query for all ``ids``.
+
+        Args:
+            user (AppUser): user to get statuses for.
+            ids (list): ids of tracks.
+
+        Returns:
+            dict: track id -> dict with ``liked`` and ``owned`` flags and
+                number of ``listens`` of the track by user (listens older
+                than retention period are not counted).
+
+        """
+        liked = set(
+            LikeTrack.objects.filter(user=user, track__in=ids)
+            .values_list('track', flat=True)
+        )
+        owned = set(
+            self.owned_by(user).filter(pk__in=ids)
+            .values_list('pk', flat=True)
+        )
+        listens = dict(
+            ListenTrack.objects.filter(user=user, track__in=ids)
+            .order_by().values_list('track').annotate(Count('pk'))
+        )
+        return {
+            pk: {
+                'liked': pk in liked,
+                'owned': pk in owned,
+                'listens': listens.get(pk, 0),
+            }
+            for pk in ids
+        }
+
+    def most_played(self, since):
+        """Tracks listened since ``since`` day ordered by number of plays.
+
+        Plays are read from daily rollups, so cost of query depends on the
+        length of the period, not on the size of listens history.
+
+        Args:
+            since (date): first day of the period.
+
+        """
+        return self.filter(daily_listens__day__gte=since) \
+            .annotate(plays=Sum('daily_listens__count')) \
+            .order_by('-plays', 'pk')
+
+
 class Track(MusicItem):
     """Music track with its title, price and album if exists.
 
     Attributes:
         album (Album): album that contains the track.
-        full_version (str): full version of track content.
+        full_version (str): full version of track content stored inline.
+            Empty for tracks with ``content_file``.
+        content_file (file): full version of track content in the storage.
         free_version (str): free shortened version of track content.
-            Equal to full_version[:25].
+            Equal to full_version[:25] or beginning of ``content_file``.
 
     """
     bought_users = models.ManyToManyField(
@@ -216,26 +618,56 @@ class Track(MusicItem):
     )
     full_version = models.TextField(
         verbose_name=_('full version'),
+        blank=True,
+    )
+    content_file = models.FileField(
+        verbose_name=_('content file'),
+        upload_to=upload_track_content_to,
+        blank=True,
     )
     free_version = models.TextField(
         verbose_name=_('free version'),
         default='free version'
     )
 
+    objects = TrackQuerySet.as_manager()
+
     class Meta(MusicItem.Meta):
+        indexes = [
+            GinIndex(fields=['search_vector'], name='track_search_vector'),
+        ]
         verbose_name = _('Track')
         verbose_name_plural = _('Tracks')
 
     def save(self, *args, **kwargs):
         """Saves reduced data to free_version field.
 
+        Free version of tracks with ``content_file`` is derived when content
+        is stored (see ``content.store_track_content``).
+
         """
-        self.free_version = self.full_version[:25]
+        if self.full_version:
+            self.free_version = self.full_version[:FREE_VERSION_LENGTH]
         # Get author's name from related album if its not defined
         if not self.author and self.album:
             self.author = self.album.author
         super().save(*args, **kwargs)
 
+    def update_counters(self, **deltas):
+        """Shift popularity counters of the track and its album.
+
+        Album's counters of likes and listens are sums of its tracks'
+        counters, purchases of tracks are not counted for album.
+
+        Args:
+            deltas (dict): counter name -> value to add.
+
+        """
+        super().update_counters(**deltas)
+        deltas.pop('purchases_count', None)
+        if self.album_id and deltas:
+            Album(pk=self.album_id).update_counters(**deltas)
+
     def is_liked(self, user):
         """Check if the track is liked by the user.
 
@@ -248,22 +680,68 @@ class Track(MusicItem):
     def like(self, user):
         """Create 'Like' for the track by some user.
 
+        Like is created and popularity counters are updated with a single
+        statement, which is safe for concurrent likes of the same user.
+
         Args:
             user (AppUser): user who likes the track.
 
+        Returns:
+            bool: True if track is liked, False if it was liked already.
+
         """
-        if not self.is_liked(user):
-            return LikeTrack.objects.create(user=user, track=self)
+        return self._change_likes(LIKE_SQL, 1, user)
 
     def unlike(self, user):
         """Remove 'Like' from the track by some user.
 
+        Like is removed and popularity counters are updated with a single
+        statement.
+
         Args:
             user (AppUser): user who removes like from the track.
 
+        Returns:
+            bool: True if like is removed, False if track wasn't liked.
+
         """
-        if self.is_liked(user):
-            return LikeTrack.objects.filter(user=user, track=self).delete()
+        return self._change_likes(UNLIKE_SQL, -1, user)
+
+    def _change_likes(self, change_sql, delta, user):
+        """Run ``change_sql`` and shift likes counters if it changed a row.
+
+        Changed track and album are returned by the same statement to
+        invalidate cached querysets with them.
+
+        """
+        from .caching import get_filtered_fields, invalidate_counters
+        quote_name = connection.ops.quote_name
+        sql = CHANGE_LIKES_SQL.format(
+            change=change_sql.format(
+                like=quote_name(LikeTrack._meta.db_table),
+            ),
+            track=quote_name(Track._meta.db_table),
+            album=quote_name(Album._meta.db_table),
+            track_fields=', '.join(
+                quote_name(name) for name in get_filtered_fields(Track)
+            ),
+            album_fields=', '.join(
+                quote_name(name) for name in get_filtered_fields(Album)
+            ),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {
+                'track': self.pk,
+                'user': user.pk,
+                'delta': delta,
+            })
+            track, album = cursor.fetchone()
+
+        deltas = {'likes_count': delta}
+        for model, item in ((Track, track), (Album, album)):
+            if item is not None:
+                invalidate_counters(model, [item], {item['id']: deltas})
+        return track is not None
 
     def listen(self, user):
         """Note about the track was listened by some user
@@ -272,7 +750,9 @@ class Track(MusicItem):
             user (AppUser): user who listened to the track.
 
         """
-        return ListenTrack.objects.create(user=user, track=self)
+        listen = ListenTrack.objects.create(user=user, track=self)
+        self.update_counters(listens_count=1)
+        return listen
 
 
 class BoughtItem(TimeStampedModel):
@@ -349,6 +829,12 @@ class LikeTrack(TimeStampedModel):
 
     class Meta:
         unique_together = (('track', 'user'),)
+        indexes = [
+            models.Index(
+                fields=['user', 'created'],
+                name='liketrack_user_created',
+            ),
+        ]
         verbose_name = _('Like')
         verbose_name_plural = _('Likes')
 
@@ -372,8 +858,223 @@ class ListenTrack(TimeStampedModel):
     )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'created'],
+                name='listentrack_user_created',
+            ),
+        ]
         verbose_name = _('Listen')
         verbose_name_plural = _('Listens')
 
     def __str__(self):
         return f'{self.user} listened {self.track}'
+
+
+class DailyListens(models.Model):
+    """Number of listens per day, base class of listens rollups.
+
+    Rollups are built from ``ListenTrack`` by ``rollups.rollup_listens``
+    for every complete day.
+
+    Attributes:
+        day (date): day of listens.
+        count (int): number of listens.
+
+    """
+    day = models.DateField(
+        verbose_name=_('day'),
+        db_index=True,
+    )
+    count = models.PositiveIntegerField(
+        verbose_name=_('listens'),
+    )
+
+    class Meta:
+        abstract = True
+        ordering = ('-day',)
+
+
+class TrackDailyListens(DailyListens):
+    """Number of listens of track per day"""
+    track = models.ForeignKey(
+        Track,
+        verbose_name=_('track'),
+        related_name='daily_listens',
+    )
+
+    class Meta(DailyListens.Meta):
+        unique_together = (('track', 'day'),)
+        verbose_name = _('Daily listens of track')
+        verbose_name_plural = _('Daily listens of tracks')
+
+    def __str__(self):
+        return f'{self.track} listened {self.count} times on {self.day}'
+
+
+class UserDailyListens(DailyListens):
+    """Number of listens by user per day"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_('user'),
+        related_name='daily_listens',
+    )
+
+    class Meta(DailyListens.Meta):
+        unique_together = (('user', 'day'),)
+        verbose_name = _('Daily listens of user')
+        verbose_name_plural = _('Daily listens of users')
+
+    def __str__(self):
+        return f'{self.user} listened {self.count} times on {self.day}'
+
+
+class ImportJobQuerySet(models.QuerySet):
+
+    def resumable(self):
+        """Jobs, which failed or made no progress for a long time.
+
+        Running jobs with recent progress are excluded, as their shards are
+        still processed by workers.
+
+        """
+        stale_before = timezone.now() - timedelta(
+            seconds=settings.MUSIC_STORE_IMPORT_STALE_TIMEOUT,
+        )
+        return self.filter(
+            Q(status=ImportJob.STATUS_FAILED) |
+            Q(
+                status__in=(ImportJob.STATUS_PENDING,
+                            ImportJob.STATUS_RUNNING),
+                modified__lt=stale_before,
+            )
+        )
+
+
+class ImportJob(TimeStampedModel):
+    """Import of albums and tracks from uploaded zip archive.
+
+    Archive is processed by shards in parallel (see ``tasks.import_archive``)
+    and each shard commits its progress after every batch of entries. So if
+    a worker crashes, import can be resumed from the last committed offset
+    of each shard.
+
+    Attributes:
+        file (file): uploaded zip archive.
+        status (str): status of import.
+        total (int): number of track files in archive.
+        processed (int): number of processed track files.
+        shard_offsets (list): number of processed track files per shard.
+        stats (dict): numbers of created albums, created and skipped tracks.
+        errors (list): errors of broken archive entries.
+
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUSES = (
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_RUNNING, _('Running')),
+        (STATUS_DONE, _('Done')),
+        (STATUS_FAILED, _('Failed')),
+    )
+
+    file = models.FileField(
+        verbose_name=_('file'),
+        upload_to=upload_import_to,
+    )
+    status = models.CharField(
+        verbose_name=_('status'),
+        max_length=10,
+        choices=STATUSES,
+        default=STATUS_PENDING,
+    )
+    total = models.PositiveIntegerField(
+        verbose_name=_('total entries'),
+        default=0,
+    )
+    processed = models.PositiveIntegerField(
+        verbose_name=_('processed entries'),
+        default=0,
+    )
+    shard_offsets = ArrayField(
+        models.PositiveIntegerField(),
+        verbose_name=_('shard offsets'),
+        default=list,
+    )
+    stats = JSONField(
+        verbose_name=_('statistics'),
+        default=dict,
+    )
+    errors = JSONField(
+        verbose_name=_('errors'),
+        default=list,
+    )
+
+    objects = ImportJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Import job')
+        verbose_name_plural = _('Import jobs')
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'Import of {self.file.name} ({self.status})'
+
+    @property
+    def is_finished(self):
+        """bool: True if job is done or failed"""
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def start(self, shard_sizes):
+        """Mark job as running with planned shards.
+
+        Offsets of shards are kept when job is resumed.
+
+        Args:
+            shard_sizes (list): numbers of track files in shards.
+
+        """
+        if len(self.shard_offsets) != len(shard_sizes):
+            self.shard_offsets = [0] * len(shard_sizes)
+        self.total = sum(shard_sizes)
+        self.status = self.STATUS_RUNNING
+        self.save(update_fields=[
+            'total', 'shard_offsets', 'status', 'modified',
+        ])
+
+    def commit_progress(self, shard, count, stats):
+        """Record progress of shard after processed batch of entries.
+
+        Job row is locked, so parallel shards don't overwrite each other's
+        progress. Should be called in the same transaction as processing of
+        the batch, then offset is committed together with its results.
+
+        Args:
+            shard (int): index of shard.
+            count (int): number of processed entries.
+            stats (dict): result of ``AlbumUploader.bulk_zip_album_handler``.
+
+        """
+        with transaction.atomic():
+            job = self.__class__.objects.select_for_update().get(pk=self.pk)
+            job.shard_offsets[shard] += count
+            job.processed += count
+            job.errors.extend(stats['errors'])
+            for key in ('albums', 'tracks', 'skipped'):
+                job.stats[key] = job.stats.get(key, 0) + stats[key]
+            # ``modified`` shows that job is alive (see ``resumable()``)
+            job.save(update_fields=[
+                'shard_offsets', 'processed', 'errors', 'stats', 'modified',
+            ])
+
+    def finish(self, error=None):
+        """Mark job as done or failed with ``error``"""
+        self.refresh_from_db()
+        self.status = self.STATUS_DONE
+        if error:
+            self.status = self.STATUS_FAILED
+            self.errors.append({'entry': None, 'error': error})
+        self.save(update_fields=['status', 'errors', 'modified'])
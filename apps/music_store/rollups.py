@@ -0,0 +1,183 @@
+"""Daily rollups and retention of listens history.
+
+Raw ``ListenTrack`` rows are rolled up into ``TrackDailyListens`` and
+``UserDailyListens`` for every complete day, then analytics read rollups
+only. Last ``MUSIC_STORE_LISTENS_ROLLUP_OVERLAP_DAYS`` rolled up days are
+rolled up again on each run, as listens buffered in Redis may be written
+after their day is rolled up. Raw listens older than
+``MUSIC_STORE_LISTENS_RETENTION_DAYS`` are archived into the file storage
+as gzipped CSV (one file per day) and are removed from database.
+
+"""
+import csv
+import gzip
+import io
+from datetime import datetime, time, timedelta
+from tempfile import TemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import ListenTrack, TrackDailyListens, UserDailyListens
+
+ARCHIVE_PATH = 'archive/listens/{day}.csv.gz'
+
+# upsert of rollups of a day, counts never decrease, so listens of a day
+# archived meanwhile aren't lost
+ROLLUP_DAY_SQL = """
+INSERT INTO {rollup} (day, {field}, count)
+SELECT %(day)s, {field}, COUNT(*) FROM {listen}
+WHERE created >= %(start)s AND created < %(end)s
+GROUP BY {field}
+ON CONFLICT ({field}, day) DO UPDATE
+SET count = GREATEST({rollup}.count, EXCLUDED.count)
+"""
+
+
+def day_range(day):
+    """Get aware datetimes of the beginning of ``day`` and the next day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(1), time.min))
+    return start, end
+
+
+def rolled_up_until():
+    """Get the first day, which is not rolled up yet.
+
+    Returns:
+        date: day after the last rolled up day or None if there are no
+            rollups.
+
+    """
+    last_day = TrackDailyListens.objects.aggregate(day=Max('day'))['day']
+    return last_day + timedelta(1) if last_day else None
+
+
+def rollup_day(day):
+    """Build rollups of listens of tracks and users for ``day``.
+
+    Rollups are upserted, so it's safe to run it again, i.e. to count
+    listens written after the day was rolled up.
+
+    """
+    start, end = day_range(day)
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model, field in ((TrackDailyListens, 'track_id'),
+                             (UserDailyListens, 'user_id')):
+            cursor.execute(
+                ROLLUP_DAY_SQL.format(
+                    rollup=quote_name(model._meta.db_table),
+                    listen=quote_name(ListenTrack._meta.db_table),
+                    field=field,
+                ),
+                {'day': day, 'start': start, 'end': end},
+            )
+
+
+def rollup_listens(until=None):
+    """Build rollups for all complete days, which are not rolled up yet.
+
+    Last ``MUSIC_STORE_LISTENS_ROLLUP_OVERLAP_DAYS`` rolled up days are
+    rolled up again.
+
+    Args:
+        until (date): first day not to roll up, default is today.
+
+    Returns:
+        list: rolled up days.
+
+    """
+    until = until or timezone.localdate()
+    day = rolled_up_until()
+    if day is not None:
+        day -= timedelta(settings.MUSIC_STORE_LISTENS_ROLLUP_OVERLAP_DAYS)
+    else:
+        first = ListenTrack.objects.aggregate(created=Min('created'))
+        if first['created'] is None:
+            return []
+        day = timezone.localdate(first['created'])
+
+    days = []
+    while day < until:
+        rollup_day(day)
+        days.append(day)
+        day += timedelta(1)
+    return days
+
+
+def archive_listens(before):
+    """Archive and remove raw listens of days before ``before`` day.
+
+    Only rolled up days are archived.
+
+    Returns:
+        list: archived files names.
+
+    """
+    boundary = rolled_up_until()
+    if boundary is None:
+        return []
+    before = min(before, boundary)
+
+    names = []
+    while True:
+        first = ListenTrack.objects.filter(created__lt=day_range(before)[0]) \
+            .aggregate(created=Min('created'))['created']
+        if first is None:
+            return names
+        names.append(_archive_day(timezone.localdate(first)))
+
+
+def _archive_day(day):
+    """Write raw listens of the ``day`` into storage and remove them"""
+    start, end = day_range(day)
+    listens = ListenTrack.objects.filter(created__gte=start, created__lt=end)
+
+    with TemporaryFile() as archive:
+        with gzip.GzipFile(fileobj=archive, mode='wb') as gzip_file:
+            text = io.TextIOWrapper(gzip_file, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(('user', 'track', 'created'))
+            rows = listens.order_by('created') \
+                .values_list('user', 'track', 'created')
+            for user_id, track_id, created in rows.iterator():
+                writer.writerow((user_id, track_id, created.isoformat()))
+            text.flush()
+            text.detach()
+        archive.seek(0)
+        name = default_storage.save(
+            ARCHIVE_PATH.format(day=day),
+            File(archive),
+        )
+
+    listens.delete()
+    return name
+
+
+def listens_by_track():
+    """Get total number of listens of tracks from rollups and raw listens.
+
+    Listens of rolled up days are taken from rollups, as raw listens of
+    these days may be archived already.
+
+    Returns:
+        dict: track id -> number of listens.
+
+    """
+    boundary = rolled_up_until()
+    raw = ListenTrack.objects.order_by()
+    totals = {}
+    if boundary is not None:
+        raw = raw.filter(created__gte=day_range(boundary)[0])
+        totals.update(
+            TrackDailyListens.objects.order_by().values_list('track')
+            .annotate(Sum('count'))
+        )
+    for track_id, count in raw.values_list('track').annotate(Count('pk')):
+        totals[track_id] = totals.get(track_id, 0) + count
+    return totals
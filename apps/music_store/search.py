@@ -0,0 +1,97 @@
+"""Full text search of tracks and albums.
+
+Every item has ``search_vector`` with words of its title (weight A) and
+author (weight B), it is maintained by database trigger on insert or
+update of these fields (see migration ``0010_search_index``) and is
+indexed by GIN index. ``simple`` configuration is used, as titles and
+authors are names, which shouldn't be stemmed.
+
+Items are matched when all words of query are prefixes of their words or
+query is a substring of title or author. Substring matching is served by
+trigram GIN indexes over ``UPPER(title)`` and ``UPPER(author)``, which
+are used by ``icontains`` lookups. If nothing is matched, items with
+similar title or author are searched (fuzzy search by trigrams).
+
+"""
+import re
+
+from django.contrib.postgres.search import SearchQueryField, SearchRank
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.functions import Greatest, Upper
+
+WORD_RE = re.compile(r'\w+')
+
+
+class PrefixSearchQuery(Func):
+    """Full text query matching all words of ``query`` by prefix"""
+    function = 'to_tsquery'
+    template = "%(function)s('simple'::regconfig, %(expressions)s)"
+
+    def __init__(self, query):
+        words = WORD_RE.findall(query)
+        super().__init__(
+            Value(' & '.join(f'{word}:*' for word in words)),
+            output_field=SearchQueryField(),
+        )
+
+
+class TrigramSimilarity(Func):
+    """Trigram similarity of uppercase ``expression`` and ``query``"""
+    function = 'SIMILARITY'
+
+    def __init__(self, expression, query, **extra):
+        super().__init__(
+            Upper(expression),
+            Value(query.upper()),
+            output_field=FloatField(),
+            **extra
+        )
+
+
+def search_items(queryset, query, page, fuzzy=True):
+    """Search items of ``queryset`` by ``query``, ordered by relevance.
+
+    Fuzzy search is made only if the page of matched items is empty, so
+    nothing is checked in advance when the first page is found.
+
+    Args:
+        queryset (QuerySet): tracks or albums.
+        query (str): search query.
+        page (slice): requested page of found items.
+        fuzzy (bool): search items with similar title or author if nothing
+            matched the query.
+
+    Returns:
+        list: found items of the page.
+
+    """
+    search_filter = Q(title__icontains=query) | Q(author__icontains=query)
+    rank = Value(0, output_field=FloatField())
+    if WORD_RE.search(query):
+        ts_query = PrefixSearchQuery(query)
+        search_filter |= Q(search_vector=ts_query)
+        rank = SearchRank(F('search_vector'), ts_query)
+
+    matched = queryset.filter(search_filter) \
+        .annotate(rank=rank) \
+        .order_by('-rank', 'pk')
+    items = list(matched[page])
+    # empty page after the first one doesn't mean nothing is matched
+    if items or not fuzzy or (page.start and matched.exists()):
+        return items
+
+    similar = queryset \
+        .annotate(
+            upper_title=Upper('title'),
+            upper_author=Upper('author'),
+        ) \
+        .filter(
+            Q(upper_title__trigram_similar=query.upper()) |
+            Q(upper_author__trigram_similar=query.upper())
+        ) \
+        .annotate(rank=Greatest(
+            TrigramSimilarity('title', query),
+            TrigramSimilarity('author', query),
+        )) \
+        .order_by('-rank', 'pk')
+    return list(similar[page])
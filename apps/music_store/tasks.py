@@ -1,6 +1,36 @@
-from celery import shared_task
-from .utils import handle_uploaded_archive
+import logging
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
 from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from celery import chord, shared_task
+from celery.signals import worker_shutdown
+
+from .caching import get_filtered_fields, invalidate_counters
+from .listens import flush_listens_buffer
+from .models import (
+    Album,
+    BoughtAlbum,
+    BoughtTrack,
+    ImportJob,
+    LikeTrack,
+    Track,
+)
+from .rollups import archive_listens, listens_by_track, rollup_listens
+from .utils import (
+    AlbumUploader,
+    NestedDirectoryError,
+    handle_uploaded_archive,
+    open_uploaded_archive,
+    split_uploaded_archive,
+)
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
@@ -12,5 +42,200 @@ def get_albums_from_zip(zip_filename):
 
     """
     zip_file = default_storage.open(zip_filename)
-    handle_uploaded_archive(zip_file)
-    return f'{zip_filename} processed'
+    stats = handle_uploaded_archive(zip_file)
+    return f'{zip_filename} processed: {stats}'
+
+
+@shared_task
+def import_archive(job_id, shard_size=None):
+    """Import albums and tracks from ZIP file of import job by shards.
+
+    Planner of import: reads central directory of archive, splits tracks
+    into album-aligned shards and processes them in parallel by
+    ``import_archive_shard`` subtasks. When all shards are processed, job
+    is finished by ``report_archive_import``.
+
+    Splitting is deterministic, so running the task again for unfinished
+    job resumes it: every shard continues from its committed offset.
+
+    Args:
+        job_id (int): id of ImportJob.
+        shard_size (int): desirable number of tracks in shard, default is
+            ``MUSIC_STORE_IMPORT_SHARD_SIZE``.
+
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    shard_size = shard_size or settings.MUSIC_STORE_IMPORT_SHARD_SIZE
+    try:
+        with job.file.storage.open(job.file.name) as zip_file:
+            shards = split_uploaded_archive(zip_file, shard_size)
+    except (TypeError, NestedDirectoryError, zipfile.BadZipFile) as e:
+        job.finish(error=str(e))
+        raise
+
+    job.start([len(names) for names in shards])
+
+    # if any shard fails, callback isn't called, but its errback is
+    callback = report_archive_import.s(job_id).on_error(
+        fail_archive_import.s(job_id=job_id),
+    )
+    if not shards:
+        return callback.delay([])
+
+    return chord(
+        import_archive_shard.s(job_id, shard, names)
+        for shard, names in enumerate(shards)
+    )(callback)
+
+
+@shared_task(acks_late=True)
+def import_archive_shard(job_id, shard, names):
+    """Import tracks with ``names`` from ZIP file of import job.
+
+    Tracks are processed by batches starting from committed offset of the
+    shard. Each batch is committed together with progress of the job, so
+    task is acknowledged late and is safe to be redelivered after crash of
+    worker.
+
+    Args:
+        job_id (int): id of ImportJob.
+        shard (int): index of shard.
+        names (list): names of track files in archive.
+
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    album_uploader = AlbumUploader()
+    batch_size = album_uploader.batch_size
+
+    with job.file.storage.open(job.file.name) as archive_file:
+        with open_uploaded_archive(archive_file) as zip_file:
+            offset = job.shard_offsets[shard]
+            for start in range(offset, len(names), batch_size):
+                batch = names[start:start + batch_size]
+                with transaction.atomic():
+                    stats = album_uploader.bulk_zip_album_handler(
+                        zip_file,
+                        batch,
+                    )
+                    job.commit_progress(shard, len(batch), stats)
+
+
+@shared_task
+def report_archive_import(results, job_id):
+    """Finish import job when all its shards are processed.
+
+    Args:
+        results (list): results of ``import_archive_shard`` subtasks.
+        job_id (int): id of ImportJob.
+
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    job.finish()
+    logger.info(f'{job} finished by {len(results)} shards: {job.stats}')
+    return job.stats
+
+
+@shared_task
+def fail_archive_import(*args, job_id):
+    """Mark import job as failed when its shard has failed.
+
+    Used as errback, so it's called with id of failed task or with its
+    request, exception and traceback depending on the failure.
+
+    Args:
+        job_id (int): id of ImportJob.
+
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    job.finish(error='Import of shard failed, job can be resumed')
+    logger.error(f'{job} failed')
+
+
+def _count_by(queryset, field, aggregate=None):
+    """Get dict ``field`` value -> number of rows (or ``aggregate``)"""
+    rows = queryset.order_by().values_list(field) \
+        .annotate(aggregate or Count('pk'))
+    return dict(rows)
+
+
+def _reconcile_counters(model, counters):
+    """Fix popularity counters of ``model`` items, which drifted.
+
+    Args:
+        model (MusicItem): model of items.
+        counters (dict): counter name -> dict item id -> actual value.
+
+    Returns:
+        int: number of fixed items.
+
+    """
+    fixed = 0
+    # filtered fields are loaded to invalidate cached querysets of items
+    items = model.objects.order_by().values(*get_filtered_fields(model))
+    for item in items.iterator():
+        actual = {name: counters[name].get(item['id'], 0) for name in counters}
+        if any(item[name] != value for name, value in actual.items()):
+            model.objects.filter(pk=item['id']).update(**actual)
+            invalidate_counters(model, [dict(item, **actual)], {item['id']: {
+                name: value - item[name] for name, value in actual.items()
+            }})
+            fixed += 1
+    return fixed
+
+
+@shared_task
+def reconcile_popularity_counters():
+    """Recalculate popularity counters of tracks and albums.
+
+    Counters are maintained incrementally, but they may drift, i.e. when
+    likes or listens are removed in admin. The task fixes only items with
+    drifted counters and is scheduled to run nightly by celery beat.
+
+    """
+    fixed_tracks = _reconcile_counters(Track, {
+        'likes_count': _count_by(LikeTrack.objects, 'track'),
+        'listens_count': listens_by_track(),
+        'purchases_count': _count_by(BoughtTrack.objects, 'item'),
+    })
+    fixed_albums = _reconcile_counters(Album, {
+        'likes_count': _count_by(
+            Track.objects.exclude(album=None),
+            'album',
+            Sum('likes_count'),
+        ),
+        'listens_count': _count_by(
+            Track.objects.exclude(album=None),
+            'album',
+            Sum('listens_count'),
+        ),
+        'purchases_count': _count_by(BoughtAlbum.objects, 'item'),
+    })
+    return f'Fixed counters of {fixed_tracks} tracks, {fixed_albums} albums'
+
+
+@shared_task
+def flush_listens():
+    """Write listens buffered in Redis into database."""
+    return f'{flush_listens_buffer()} listens written'
+
+
+@worker_shutdown.connect
+def flush_listens_on_shutdown(**kwargs):
+    """Write buffered listens into database when worker is stopped."""
+    if settings.MUSIC_STORE_BUFFERED_LISTENS:
+        written = flush_listens_buffer()
+        logger.info(f'{written} buffered listens written on shutdown')
+
+
+@shared_task
+def rollup_daily_listens():
+    """Build daily rollups of listens and archive old raw listens.
+
+    Raw listens older than ``MUSIC_STORE_LISTENS_RETENTION_DAYS`` days are
+    archived into the file storage and removed from database.
+
+    """
+    days = rollup_listens()
+    retention = timedelta(settings.MUSIC_STORE_LISTENS_RETENTION_DAYS)
+    archived = archive_listens(timezone.localdate() - retention)
+    return f'Rolled up {len(days)} days, archived {len(archived)} days'
@@ -1,7 +1,13 @@
+from io import BytesIO
 from operator import methodcaller
 
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
 from faker import Faker
 from rest_framework import status
+from rest_framework.pagination import Cursor
 from rest_framework.test import (
     APIClient,
     APITestCase,
@@ -12,16 +18,20 @@ from ..factories import (
     AlbumFactory,
     BoughtTrackFactory,
     LikeTrackFactory,
+    ListenTrackFactory,
     TrackFactoryLongFullVersion,
     TrackFactory,
     BoughtAlbumFactory,
     UserWithPaymentMethodFactory,
     PaymentMethodFactory,
     UserWithBalanceFactory,
+    UserWithDefaultPaymentMethodFactory,
     TrackWithoutAlbumFactory
 )
+from ..content import store_track_content
 from ..models import Track
 from apps.music_store.api.serializers import TrackSerializer
+from libs.api.pagination import OrderByIDCursorPagination
 
 fake = Faker()
 
@@ -104,6 +114,37 @@ class TestAPIMusicStorePaymentMethods(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_payment_methods_set_default(self):
+        """ Switch default payment method """
+        user = UserWithDefaultPaymentMethodFactory()
+        old_default = user.default_payment
+        payment_method = PaymentMethodFactory(owner=user)
+
+        self.client.force_authenticate(user=user)
+        url = api_url(f'payment_methods/{payment_method.pk}/set_default/')
+        response = self.client.post(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_default'])
+        old_default.refresh_from_db()
+        self.assertFalse(old_default.is_default)
+        user.refresh_from_db()
+        self.assertEqual(user.default_payment, payment_method)
+
+    def test_account(self):
+        """ Account is served with prefetched payment methods """
+        user = UserWithDefaultPaymentMethodFactory()
+        PaymentMethodFactory.create_batch(3, owner=user)
+
+        self.client.force_authenticate(user=user)
+        with self.assertNumQueries(2):
+            response = self.client.get(api_url('account/'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['payment_methods']), 4)
+        self.assertEqual(response.data['default_payment'],
+                         user.default_payment.pk)
+
     def _api_payment_method(self, data, user=None, method="post"):
         """ Method for send request to PaymentMethod Api """
         if user:
@@ -174,6 +215,50 @@ class TestAPITrack(APITestCase):
             self.track.full_version
         )
 
+    def test_content_of_tracks_list_login_bought(self):
+        """Full version is provided for bought tracks in list"""
+        self.client.force_authenticate(user=self.user)
+        BoughtTrackFactory(user=self.user, item=self.track)
+
+        response = self.client.get(f'{self.url}?album={self.track.album_id}')
+        self.assertEqual(
+            response.data[0]['content'],
+            self.track.full_version
+        )
+
+    def test_content_of_album_tracks_login_bought(self):
+        """Full version is provided for tracks of bought album"""
+        self.client.force_authenticate(user=self.user)
+        BoughtAlbumFactory(user=self.user, item=self.track.album)
+
+        response = self.client.get(f'{self.url}{self.track.id}/')
+        self.assertEqual(
+            response.data['content'],
+            self.track.full_version
+        )
+
+    def test_list_of_tracks_constant_queries(self):
+        """Number of queries doesn't depend on number of tracks"""
+        self.client.force_authenticate(user=self.user)
+        queries = []
+        for count in (2, 10):
+            album = AlbumFactory()
+            tracks = TrackFactory.create_batch(count, album=album)
+            BoughtTrackFactory(user=self.user, item=tracks[0])
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(f'{self.url}?album={album.id}')
+            self.assertEqual(len(response.data), count)
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
+
+    def test_list_of_tracks_not_bought_without_content(self):
+        """Full version isn't loaded when tracks are not bought"""
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        for query in context.captured_queries:
+            self.assertNotIn('full_version', query['sql'])
+
     def test_get_tracks_of_album(self):
         """Test filtering tracks with album they relate to"""
         self.client.force_authenticate(user=self.user)
@@ -185,6 +270,176 @@ class TestAPITrack(APITestCase):
 
         self.assertEqual(len(tracks), len(response.data))
 
+    def test_tracks_cursor_pagination(self):
+        """Tracks are paginated by id without total count"""
+        TrackFactory.create_batch(2)
+        ids = list(Track.objects.order_by('id').values_list('id', flat=True))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'pageSize': 2})
+        self.assertNotIn('count', response.data)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+        self.assertEqual(
+            [track['id'] for track in response.data['results']],
+            ids[:2],
+        )
+
+        response = self.client.get(
+            self.url,
+            {'pageSize': 2, 'cursor': response.data['next']},
+        )
+        self.assertEqual(
+            [track['id'] for track in response.data['results']],
+            ids[2:4],
+        )
+
+    def test_sort_and_filter_tracks_by_popularity(self):
+        """Test ordering and filtering tracks with popularity counters"""
+        tracks = TrackFactory.create_batch(3)
+        for likes, track in enumerate(tracks):
+            Track.objects.filter(pk=track.pk).update(likes_count=likes)
+
+        response = self.client.get(
+            f'{self.url}?likes_count__gte=1&ordering=-likes_count'
+        )
+
+        self.assertEqual(
+            [track['id'] for track in response.data],
+            [tracks[2].id, tracks[1].id],
+        )
+
+    def test_paginate_tracks_by_popularity(self):
+        """Tracks with equal counters are paginated by keyset with id"""
+        Track.objects.update(likes_count=0)
+        TrackFactory.create_batch(5)
+        Track.objects.filter(
+            pk=Track.objects.order_by('id').first().pk,
+        ).update(likes_count=1)
+        ids = list(
+            Track.objects.order_by('-likes_count', '-id')
+            .values_list('id', flat=True)
+        )
+
+        pages = []
+        params = {'pageSize': 2, 'ordering': '-likes_count'}
+        response = self.client.get(self.url, params)
+        pages.append(response.data['results'])
+        while response.data['next']:
+            response = self.client.get(
+                self.url,
+                dict(params, cursor=response.data['next']),
+            )
+            pages.append(response.data['results'])
+
+        self.assertEqual(
+            [track['id'] for page in pages for track in page],
+            ids,
+        )
+
+        response = self.client.get(
+            self.url,
+            dict(params, cursor=response.data['previous']),
+        )
+        self.assertEqual(
+            [track['id'] for track in response.data['results']],
+            [track['id'] for track in pages[-2]],
+        )
+
+    def test_paginate_tracks_with_limit(self):
+        """``limit`` of former limit/offset pagination is page size"""
+        TrackFactory.create_batch(3)
+
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(self.url, {'limit': 2, 'offset': 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paginate_tracks_invalid_cursor(self):
+        """Cursor with values not matching ordering fields is rejected"""
+        paginator = OrderByIDCursorPagination()
+        for position in ('["x", 1]', '[null, 1]', '[1]', '{}'):
+            cursor = paginator.encode_cursor(
+                Cursor(offset=0, reverse=False, position=position),
+            )
+            response = self.client.get(self.url, {
+                'pageSize': 2,
+                'ordering': '-likes_count',
+                'cursor': cursor,
+            })
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage')
+class TestAPITrackContent(APITestCase):
+    """Tests for streaming of track content."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        self.track = TrackWithoutAlbumFactory(full_version='')
+        store_track_content(
+            self.track,
+            BytesIO(b'0123456789' * 10),
+            'content.txt',
+        )
+        self.track.save()
+        self.url = api_url(f'tracks/{self.track.id}/content/')
+
+    def test_content_not_bought(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_content_bought(self):
+        BoughtTrackFactory(user=self.user, item=self.track)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            b'0123456789' * 10,
+        )
+
+    def test_content_range(self):
+        BoughtTrackFactory(user=self.user, item=self.track)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5-14')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 5-14/100')
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            b'5678901234',
+        )
+
+    def test_content_range_not_satisfiable(self):
+        BoughtTrackFactory(user=self.user, item=self.track)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_content_url_in_representation(self):
+        """Owner gets URL of content stored in file"""
+        response = self.client.get(api_url(f'tracks/{self.track.id}/'))
+        self.assertEqual(response.data['content'], self.track.free_version)
+
+        BoughtTrackFactory(user=self.user, item=self.track)
+        response = self.client.get(api_url(f'tracks/{self.track.id}/'))
+        self.assertEqual(
+            response.data['content'],
+            f'http://testserver{self.url}',
+        )
+
+    def test_inline_content_bought(self):
+        track = TrackWithoutAlbumFactory()
+        BoughtTrackFactory(user=self.user, item=track)
+        response = self.client.get(api_url(f'tracks/{track.id}/content/'))
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            track.full_version.encode(),
+        )
+
 
 class TestAPIAlbum(APITestCase):
     """Tests for Albums API."""
@@ -238,6 +493,12 @@ class TestAPILikeTrackListView(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_watch_only_own_likes(self):
+        LikeTrackFactory()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), self.count)
+
 
 class TestAPILikeUnlikeTrack(APITestCase):
     @classmethod
@@ -322,6 +583,34 @@ class TestAPIListenTrackListView(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_watch_only_own_listens(self):
+        ListenTrackFactory.create_batch(2, user=self.user)
+        ListenTrackFactory()
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data), 2)
+
+    def test_listens_cursor_pagination(self):
+        listens = ListenTrackFactory.create_batch(3, user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, {'pageSize': 2})
+        self.assertEqual(
+            [listen['id'] for listen in response.data['results']],
+            [listens[2].id, listens[1].id],
+        )
+
+        response = self.client.get(
+            self.url,
+            {'pageSize': 2, 'cursor': response.data['next']},
+        )
+        self.assertEqual(
+            [listen['id'] for listen in response.data['results']],
+            [listens[0].id],
+        )
+
 
 class TestAPIListenTrack(APITestCase):
     @classmethod
@@ -511,6 +800,72 @@ class TestAPIMusicStoreBoughtAlbum(APITestCase):
         return self.client.get(url)
 
 
+class TestAPICart(APITestCase):
+    """Tests for buying many items at once."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserWithBalanceFactory(balance=1000)
+        self.client.force_authenticate(user=self.user)
+        self.url = api_url('cart/buy/')
+
+    def test_buy_cart(self):
+        tracks = TrackFactory.create_batch(3, price=10)
+        album = AlbumFactory(price=20)
+
+        response = self.client.post(self.url, {
+            'tracks': [track.pk for track in tracks],
+            'albums': [album.pk],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user.balance, 950)
+        self.assertEqual(self.user.boughttrack_set.count(), 3)
+        self.assertTrue(album.is_bought(self.user))
+
+    def test_buy_cart_with_bought_item(self):
+        track, bought_track = TrackFactory.create_batch(2, price=10)
+        BoughtTrackFactory(user=self.user, item=bought_track)
+        balance_before = self.user.balance
+
+        response = self.client.post(self.url, {
+            'tracks': [track.pk, bought_track.pk],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.user.balance, balance_before)
+        self.assertFalse(track.is_bought(self.user))
+
+    def test_buy_cart_not_enough_money(self):
+        tracks = TrackFactory.create_batch(2, price=600)
+        response = self.client.post(self.url, {
+            'tracks': [track.pk for track in tracks],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.user.boughttrack_set.count(), 0)
+
+    def test_buy_cart_unknown_item(self):
+        response = self.client.post(self.url, {
+            'tracks': [0],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_buy_cart_constant_queries(self):
+        """Number of queries doesn't depend on size of cart"""
+        queries = []
+        for size in (2, 10):
+            tracks = TrackFactory.create_batch(size, price=1)
+            albums = AlbumFactory.create_batch(size, price=1)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, {
+                    'tracks': [track.pk for track in tracks],
+                    'albums': [album.pk for album in albums],
+                }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
+
+
 class TestAPISearch(APITestCase):
     """Test for API of 'Music Store' app.
 
@@ -615,3 +970,160 @@ class TestAPISearch(APITestCase):
         albums = response.data['albums']
         self.assertEqual(len(tracks), 2)
         self.assertEqual(len(albums), 2)
+
+    def test_global_search_by_prefixes(self):
+        response = self.client.get(self.url + 'search/?query=thr fo')
+        self.assertEqual(
+            [track['id'] for track in response.data['tracks']],
+            [self.track_1.id],
+        )
+
+    def test_global_search_ranking(self):
+        """Matches in title are ranked above matches in author"""
+        response = self.client.get(self.url + 'search/?query=two')
+        self.assertEqual(
+            [track['id'] for track in response.data['tracks']],
+            [self.track_1.id, self.track_3.id],
+        )
+
+    def test_global_search_fuzzy(self):
+        response = self.client.get(self.url + 'search/?query=uniqe1')
+        self.assertEqual(
+            [track['id'] for track in response.data['tracks']],
+            [self.track_4.id],
+        )
+
+    def test_global_search_pagination(self):
+        response = self.client.get(
+            self.url + 'search/?query=one&limit=1&offset=1'
+        )
+        self.assertEqual(len(response.data['tracks']), 1)
+        self.assertEqual(len(response.data['albums']), 1)
+
+    def test_global_search_invalid_limit(self):
+        response = self.client.get(self.url + 'search/?query=one&limit=a')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestAPITrackStatus(APITestCase):
+    """Tests for API of like, ownership and listens statuses of tracks"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = api_url('tracks/status/')
+        cls.user = UserFactory()
+        cls.tracks = TrackFactory.create_batch(3)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_statuses(self):
+        liked, owned, other = self.tracks
+        LikeTrackFactory(user=self.user, track=liked)
+        BoughtTrackFactory(user=self.user, item=owned)
+        ListenTrackFactory.create_batch(2, user=self.user, track=owned)
+
+        response = self.client.get(
+            self.url,
+            {'ids': f'{liked.id},{owned.id},{other.id}'},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            liked.id: {'liked': True, 'owned': False, 'listens': 0},
+            owned.id: {'liked': False, 'owned': True, 'listens': 2},
+            other.id: {'liked': False, 'owned': False, 'listens': 0},
+        })
+
+    def test_statuses_constant_queries(self):
+        ids = ','.join(str(track.id) for track in self.tracks)
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(self.url, {'ids': str(self.tracks[0].id)})
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.url, {'ids': ids})
+        self.assertEqual(len(one), len(many))
+
+    @override_settings(MUSIC_STORE_TRACK_STATUS_MAX_IDS=2)
+    def test_too_many_ids(self):
+        ids = ','.join(str(track.id) for track in self.tracks)
+        response = self.client.get(self.url, {'ids': ids})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_ids(self):
+        response = self.client.get(self.url, {'ids': 'a,b'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestAPIConditionalGet(APITestCase):
+    """Tests for conditional GET of catalog"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = api_url('tracks/')
+        cls.album_url = api_url('albums/')
+        cls.user = UserWithBalanceFactory(balance=100)
+        cls.album = AlbumFactory()
+        cls.tracks = TrackFactory.create_batch(3, album=cls.album, price=1)
+
+    def test_not_modified_list(self):
+        response = self.client.get(self.url, {'pageSize': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # counters don't touch ``modified``, so it can't be a validator
+        self.assertNotIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.url,
+                {'pageSize': 2},
+                HTTP_IF_NONE_MATCH=response['ETag'],
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # only the page is loaded, no aggregate over the whole table
+        self.assertLessEqual(len(queries), 1)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('MAX(', query['sql'])
+
+    def test_modified_list(self):
+        etag = self.client.get(self.url)['ETag']
+        Track.objects.filter(pk=self.tracks[0].pk).update(likes_count=1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified_track(self):
+        url = f'{self.url}{self.tracks[0].id}/'
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.tracks[1].save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_track_modified_by_purchase(self):
+        """Content of bought track changes for user"""
+        self.client.force_authenticate(user=self.user)
+        url = f'{self.url}{self.tracks[0].id}/'
+        etag = self.client.get(url)['ETag']
+
+        self.tracks[0].buy(self.user)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_album_modified_by_new_track(self):
+        url = f'{self.album_url}{self.album.id}/'
+        etag = self.client.get(url)['ETag']
+
+        TrackFactory(album=self.album)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_track(self):
+        response = self.client.get(f'{self.url}0/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from .. import autocomplete
+from ..factories import AlbumFactory, TrackWithoutAlbumFactory
+
+
+class TestPrefixIndex(TransactionTestCase):
+    """Tests of prefix index, signals update it on commit"""
+
+    def setUp(self):
+        autocomplete.reset()
+        self.track = TrackWithoutAlbumFactory(
+            title='Yellow Submarine',
+            author='The Beatles',
+        )
+        self.album = AlbumFactory(title='Abbey Road', author='The Beatles')
+        autocomplete.index.refresh()
+
+    def lookup(self, prefix, index=autocomplete.index):
+        return [
+            (item['type'], item['id'])
+            for item in index.lookup(prefix, limit=10)
+        ]
+
+    def test_lookup_by_word_prefix(self):
+        self.assertEqual(self.lookup('subm'), [('track', self.track.id)])
+        self.assertEqual(self.lookup('YELLOW S'), [('track', self.track.id)])
+        self.assertEqual(
+            set(self.lookup('beat')),
+            {('track', self.track.id), ('album', self.album.id)},
+        )
+        self.assertEqual(self.lookup('marine'), [])
+
+    def test_lookup_without_queries(self):
+        self.lookup('abbey')
+        with self.assertNumQueries(0):
+            self.lookup('road')
+
+    def test_lookup_before_build(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.lookup('abbey', autocomplete.PrefixIndex()),
+                [],
+            )
+
+    def test_lookup_starts_refresh_once_per_process(self):
+        other_index = autocomplete.PrefixIndex()
+        with self.settings(MUSIC_STORE_AUTOCOMPLETE_BACKGROUND_REFRESH=True), \
+                patch.object(autocomplete, 'Thread') as thread:
+            self.lookup('abbey', other_index)
+            self.lookup('abbey', other_index)
+            self.assertEqual(thread.call_count, 1)
+
+            # forked process starts its own thread
+            other_index.pid = -1
+            self.lookup('abbey', other_index)
+            self.assertEqual(thread.call_count, 2)
+
+    def test_index_not_changed_by_rolled_back_save(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.track.title = 'Let It Be'
+            self.track.save()
+            raise RuntimeError
+        self.assertEqual(self.lookup('let'), [])
+        self.assertEqual(self.lookup('yellow'), [('track', self.track.id)])
+
+    def test_index_follows_signals(self):
+        self.track.title = 'Let It Be'
+        self.track.save()
+        self.assertEqual(self.lookup('let'), [('track', self.track.id)])
+        self.assertEqual(self.lookup('yellow'), [])
+
+        self.album.delete()
+        self.assertEqual(self.lookup('abbey'), [])
+
+    def test_changes_of_other_process(self):
+        other_index = autocomplete.PrefixIndex()
+        other_index.refresh()
+        self.assertEqual(self.lookup('abbey', other_index),
+                         [('album', self.album.id)])
+
+        self.album.title = 'Help'
+        self.album.save()
+
+        # changes are applied outside of lookup
+        self.assertEqual(self.lookup('help', other_index), [])
+        other_index.refresh()
+        self.assertEqual(self.lookup('help', other_index),
+                         [('album', self.album.id)])
+        self.assertEqual(self.lookup('abbey', other_index), [])
+
+    def test_reset(self):
+        other_index = autocomplete.PrefixIndex()
+        other_index.refresh()
+        version = other_index.version
+
+        autocomplete.reset()
+
+        # previous index is served until it's rebuilt
+        self.assertEqual(self.lookup('abbey', other_index),
+                         [('album', self.album.id)])
+        other_index.refresh()
+        self.assertNotEqual(other_index.version, version)
+        self.assertEqual(other_index.version, other_index._get_state()[0])
+
+
+class TestAPIAutocomplete(APITransactionTestCase):
+
+    def setUp(self):
+        autocomplete.reset()
+        autocomplete.index.refresh()
+
+    def test_autocomplete(self):
+        track = TrackWithoutAlbumFactory(title='Hey Jude', author='Beatles')
+
+        response = self.client.get('/api/v1/music_store/autocomplete/',
+                                   {'query': 'jud'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{
+            'type': 'track',
+            'id': track.id,
+            'title': 'Hey Jude',
+            'author': 'Beatles',
+        }])
+
+    def test_autocomplete_without_query(self):
+        response = self.client.get('/api/v1/music_store/autocomplete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
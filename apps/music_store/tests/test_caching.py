@@ -0,0 +1,89 @@
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from apps.users.factories import AdminUserFactory, UserFactory
+from ..caching import count_cache_read, reset_cache_stats
+from ..factories import TrackFactory, UserWithBalanceFactory
+from ..models import LikeTrack, Track
+
+
+class TestAPICacheStats(APITestCase):
+    """Tests for API of statistics of cached catalog"""
+
+    url = '/api/v1/music_store/cache_stats/'
+
+    def setUp(self):
+        reset_cache_stats()
+
+    def tearDown(self):
+        reset_cache_stats()
+
+    def test_stats(self):
+        count_cache_read(Track, hit=True)
+        count_cache_read(Track, hit=True)
+        count_cache_read(Track, hit=False)
+        # reads of other models are not counted
+        count_cache_read(LikeTrack, hit=True)
+        self.client.force_authenticate(user=AdminUserFactory())
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['track'], {
+            'hits': 2,
+            'misses': 1,
+            'hit_ratio': 2 / 3,
+        })
+        self.assertEqual(response.data['album']['hits'], 0)
+
+    def test_reset_stats(self):
+        count_cache_read(Track, hit=True)
+        self.client.force_authenticate(user=AdminUserFactory())
+
+        response = self.client.delete(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(self.url).data['track']['hits'], 0)
+
+    def test_stats_forbidden_for_users(self):
+        self.client.force_authenticate(user=UserFactory())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestAPICachedCounters(APITransactionTestCase):
+    """Tests for invalidation of cached catalog on change of counters.
+
+    Cached querysets are invalidated on commit, so transactions of tests
+    are really committed.
+
+    """
+
+    url = '/api/v1/music_store/tracks/'
+
+    def setUp(self):
+        self.user = UserWithBalanceFactory(balance=100)
+        self.track = TrackFactory(price=10)
+        self.client.force_authenticate(user=self.user)
+
+    def test_like_is_read_back(self):
+        url = f'{self.url}{self.track.pk}/'
+        self.assertEqual(self.client.get(url).data['likes_count'], 0)
+        self.client.get(self.url, {'likes_count': 1})
+
+        self.client.post(f'{url}like/')
+
+        self.assertEqual(self.client.get(url).data['likes_count'], 1)
+        response = self.client.get(self.url, {'likes_count': 1})
+        self.assertEqual(
+            [track['id'] for track in response.data],
+            [self.track.pk],
+        )
+
+    def test_purchase_is_read_back(self):
+        url = f'{self.url}{self.track.pk}/'
+        self.assertEqual(self.client.get(url).data['purchases_count'], 0)
+
+        self.client.post(f'{url}buy/')
+
+        self.assertEqual(self.client.get(url).data['purchases_count'], 1)
@@ -0,0 +1,28 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.music_store.factories import UserWithBalanceFactory
+from apps.users.models import AppUser
+
+
+class TestReconcileBalances(TestCase):
+    """Tests for ``reconcile_balances`` management command"""
+
+    def setUp(self):
+        self.user = UserWithBalanceFactory(balance=100)
+        # simulate drift of balance from the ledger
+        AppUser.objects.filter(pk=self.user.pk).update(balance=42)
+
+    def test_drift_is_reported(self):
+        out = StringIO()
+        call_command('reconcile_balances', stdout=out)
+        self.assertIn('Users with drifted balance: 1', out.getvalue())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, 42)
+
+    def test_drift_is_fixed(self):
+        call_command('reconcile_balances', fix=True, stdout=StringIO())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, 100)
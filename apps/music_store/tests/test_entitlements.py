@@ -0,0 +1,120 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from cacheops.redis import redis_client
+from redis.exceptions import RedisError
+
+from apps.users.factories import UserFactory
+from ..cart import Cart
+from ..exceptions import ItemAlreadyBought
+from ..entitlements import Entitlements
+from ..factories import (
+    AlbumFactory,
+    BoughtAlbumFactory,
+    BoughtTrackFactory,
+    TrackFactory,
+    UserWithBalanceFactory,
+)
+
+
+class TestEntitlements(TestCase):
+
+    def setUp(self):
+        self.user = UserWithBalanceFactory(balance=100)
+        self.album = AlbumFactory(price=10)
+        self.album_tracks = TrackFactory.create_batch(2, album=self.album)
+        self.track = TrackFactory(price=10)
+
+    def test_owned_tracks(self):
+        BoughtTrackFactory(user=self.user, item=self.track)
+        BoughtAlbumFactory(user=self.user, item=self.album)
+        other_track = TrackFactory()
+
+        entitlements = Entitlements.for_user(self.user)
+
+        self.assertEqual(
+            entitlements.owned_tracks(
+                self.album_tracks + [self.track, other_track]
+            ),
+            {track.pk for track in self.album_tracks + [self.track]},
+        )
+        self.assertTrue(entitlements.owns_album(self.album))
+
+    def test_single_round_trip(self):
+        BoughtTrackFactory(user=self.user, item=self.track)
+        entitlements = Entitlements.for_user(self.user)
+        entitlements.populate()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                entitlements.owned_tracks(self.album_tracks + [self.track]),
+                {self.track.pk},
+            )
+
+    def test_anonymous_user_owns_nothing(self):
+        self.assertFalse(Entitlements.for_user(None).owns_track(self.track))
+
+    def test_granted_on_purchase(self):
+        entitlements = Entitlements.for_user(self.user)
+        self.assertFalse(entitlements.owns_track(self.track))
+
+        self.track.buy(self.user)
+        self.assertTrue(entitlements.owns_track(self.track))
+
+        Cart(self.user, albums=[self.album]).checkout()
+        self.assertTrue(entitlements.owns_album(self.album))
+        self.assertTrue(entitlements.owns_track(self.album_tracks[0]))
+
+    def test_track_of_bought_album_is_not_sold(self):
+        BoughtAlbumFactory(user=self.user, item=self.album)
+        track = self.album_tracks[0]
+        # factory of purchase credits balance of user with its transaction
+        self.user.refresh_from_db()
+        balance = self.user.balance
+
+        with self.assertRaises(ItemAlreadyBought):
+            track.buy(self.user)
+        with self.assertRaises(ItemAlreadyBought):
+            Cart(self.user, tracks=[track]).checkout()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, balance)
+
+    def test_track_with_its_album_is_not_sold(self):
+        cart = Cart(
+            self.user,
+            tracks=[self.album_tracks[0]],
+            albums=[self.album],
+        )
+
+        with self.assertRaises(ItemAlreadyBought):
+            cart.checkout()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, 100)
+        self.assertFalse(self.album.is_bought(self.user))
+
+    def test_revoked_on_delete(self):
+        purchase = BoughtTrackFactory(user=self.user, item=self.track)
+        self.assertTrue(self.track.is_bought(self.user))
+
+        purchase.delete()
+        self.assertFalse(self.track.is_bought(self.user))
+
+    def test_redis_unavailable(self):
+        BoughtAlbumFactory(user=self.user, item=self.album)
+        entitlements = Entitlements.for_user(self.user)
+
+        with patch.object(redis_client, 'pipeline', side_effect=RedisError):
+            self.assertEqual(
+                entitlements.owned_tracks(self.album_tracks + [self.track]),
+                {track.pk for track in self.album_tracks},
+            )
+            self.assertTrue(entitlements.owns_album(self.album))
+
+    def test_other_user(self):
+        BoughtTrackFactory(item=self.track)
+        self.assertFalse(
+            Entitlements.for_user(UserFactory()).owns_track(self.track)
+        )
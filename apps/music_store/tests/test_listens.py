@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from cacheops.redis import redis_client
+
+from apps.users.factories import UserFactory
+from ..factories import AlbumFactory, TrackFactory
+from ..listens import BUFFER_KEY, flush_listens_buffer, record_listen
+from ..models import ListenTrack
+
+
+@override_settings(
+    MUSIC_STORE_BUFFERED_LISTENS=True,
+    MUSIC_STORE_LISTENS_BATCH_SIZE=2,
+    CELERY_TASK_ALWAYS_EAGER=True,
+)
+class TestListensBuffer(TestCase):
+
+    def setUp(self):
+        redis_client.delete(BUFFER_KEY)
+        self.user = UserFactory()
+        self.album = AlbumFactory()
+        self.track = TrackFactory(album=self.album)
+
+    def tearDown(self):
+        redis_client.delete(BUFFER_KEY)
+
+    def test_listen_is_buffered(self):
+        record_listen(self.user, self.track)
+
+        self.assertFalse(ListenTrack.objects.exists())
+        self.assertEqual(redis_client.llen(BUFFER_KEY), 1)
+
+    def test_flush(self):
+        for i in range(3):
+            record_listen(self.user, self.track)
+
+        # first batch is flushed by a task once it is full
+        self.assertEqual(ListenTrack.objects.count(), 2)
+
+        self.assertEqual(flush_listens_buffer(), 1)
+        self.assertEqual(ListenTrack.objects.count(), 3)
+        self.assertEqual(redis_client.llen(BUFFER_KEY), 0)
+
+        self.track.refresh_from_db()
+        self.album.refresh_from_db()
+        self.assertEqual(self.track.listens_count, 3)
+        self.assertEqual(self.album.listens_count, 3)
+
+    def test_flush_keeps_time_of_listen(self):
+        listened = timezone.now() - timedelta(hours=1)
+        with patch('apps.music_store.listens.time.time',
+                   return_value=listened.timestamp()):
+            record_listen(self.user, self.track)
+
+        flush_listens_buffer()
+
+        created = ListenTrack.objects.get().created
+        self.assertLess(abs(created - listened), timedelta(milliseconds=1))
+
+    def test_flush_skips_removed_tracks(self):
+        record_listen(self.user, self.track)
+        self.track.delete()
+
+        self.assertEqual(flush_listens_buffer(), 0)
+        self.assertEqual(redis_client.llen(BUFFER_KEY), 0)
+
+    @override_settings(MUSIC_STORE_BUFFERED_LISTENS=False)
+    def test_listen_is_not_buffered(self):
+        record_listen(self.user, self.track)
+
+        self.assertEqual(ListenTrack.objects.count(), 1)
@@ -1,9 +1,12 @@
+from threading import Barrier, Thread
+
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from django.test import TestCase
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
 
 import factory
 
+from apps.music_store.exceptions import ItemAlreadyBought
 from apps.music_store.factories import (
     AlbumFactory,
     BoughtAlbumFactory,
@@ -15,11 +18,19 @@ from apps.music_store.factories import (
     UserWithBalanceFactory,
     PaymentMethodFactory,
     PaymentDefaultMethodFactory,
+    PaymentTransactionFactory,
     UserWithDefaultPaymentMethodFactory,
     UserWithPaymentMethodFactory
 )
-from apps.music_store.models import Album, LikeTrack, ListenTrack, Track
+from apps.music_store.models import (
+    Album,
+    LikeTrack,
+    ListenTrack,
+    PaymentMethod,
+    Track,
+)
 from apps.users.factories import UserFactory
+from apps.users.models import AppUser
 
 
 class TestPaymentAccount(TestCase):
@@ -48,6 +59,34 @@ class TestPaymentAccount(TestCase):
         track.buy(self.account)
         self.assertEqual(self.account.balance, 90)
 
+    def test_buy_twice(self):
+        track = TrackFactory(price=10)
+        track.buy(self.account)
+        with self.assertRaises(ItemAlreadyBought):
+            track.buy(self.account)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 90)
+        self.assertEqual(self.account.transactions.count(), 2)
+
+    def test_buy_records_transaction(self):
+        track = TrackFactory(price=10)
+        track.buy(self.account)
+        bought = self.account.boughttrack_set.get(item=track)
+        self.assertEqual(bought.transaction.amount, -10)
+
+    def test_balance_follows_ledger(self):
+        PaymentTransactionFactory(user=self.account, amount=50)
+        PaymentTransactionFactory(user=self.account, amount=-30)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 120)
+
+    @override_settings(MUSIC_STORE_INCREMENTAL_BALANCE=False)
+    def test_balance_follows_ledger_with_aggregation(self):
+        PaymentTransactionFactory(user=self.account, amount=50)
+        PaymentTransactionFactory(user=self.account, amount=-30)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 120)
+
     def test_select_methods(self):
         account = UserWithPaymentMethodFactory()
         self.assertEqual(account.payment_methods.count(), 1)
@@ -68,6 +107,68 @@ class TestPaymentAccount(TestCase):
             1,
         )
 
+    def test_single_default_method_enforced(self):
+        account = UserWithDefaultPaymentMethodFactory()
+        method = PaymentMethodFactory(owner=account)
+        with self.assertRaises(IntegrityError):
+            PaymentMethod.objects.filter(pk=method.pk).update(is_default=True)
+
+    def test_set_default(self):
+        account = UserWithDefaultPaymentMethodFactory()
+        method = PaymentMethodFactory(owner=account)
+
+        method.set_default()
+
+        self.assertEqual(
+            list(account.payment_methods.filter(is_default=True)),
+            [method],
+        )
+        self.assertEqual(account.default_payment, method)
+
+    def test_default_payment_follows_methods(self):
+        account = UserWithDefaultPaymentMethodFactory()
+        method = PaymentDefaultMethodFactory(owner=account)
+        account = AppUser.objects.get(pk=account.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(account.default_payment, method)
+
+        method.is_default = False
+        method.save()
+        account.refresh_from_db()
+        self.assertIsNone(account.default_payment)
+
+
+class TestConcurrentDefaultMethod(TransactionTestCase):
+    """Test for concurrent switches of default payment method"""
+
+    def test_concurrent_set_default(self):
+        account = UserWithDefaultPaymentMethodFactory()
+        methods = PaymentMethodFactory.create_batch(4, owner=account)
+        barrier = Barrier(len(methods))
+        errors = []
+
+        def set_default(method):
+            try:
+                barrier.wait()
+                method.set_default()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=set_default, args=(m,)) for m in methods]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        defaults = account.payment_methods.filter(is_default=True)
+        self.assertEqual(defaults.count(), 1)
+        account.refresh_from_db()
+        self.assertEqual(account.default_payment, defaults.get())
+
 
 class TestBought(TestCase):
     """Test for buy tracks and albums and his methods
@@ -144,6 +245,13 @@ class TestAlbumAndTrack(TestCase):
         BoughtTrackFactory(item=self.track, user=self.user)
         self.assertTrue(self.track.is_bought(self.user))
 
+    def test_track_is_bought_with_album(self):
+        track = TrackFactory(album=self.album)
+        self.assertFalse(track.is_bought(self.user))
+
+        BoughtAlbumFactory(item=self.album, user=self.user)
+        self.assertTrue(track.is_bought(self.user))
+
     def test_track_is_not_liked(self):
         self.assertFalse(self.track.is_liked(self.user))
 
@@ -183,6 +291,18 @@ class TestAlbumAndTrack(TestCase):
         self.track.unlike(user=self.user)
         self.assertFalse(self.track.is_liked(user=self.user))
 
+    def test_like_returns_whether_changed(self):
+        self.assertTrue(self.track.like(user=self.user))
+        self.assertFalse(self.track.like(user=self.user))
+        self.assertTrue(self.track.unlike(user=self.user))
+        self.assertFalse(self.track.unlike(user=self.user))
+
+    def test_like_single_query(self):
+        with self.assertNumQueries(1):
+            self.track.like(user=self.user)
+        with self.assertNumQueries(1):
+            self.track.unlike(user=self.user)
+
     def test_listen_to_track(self):
         self.track.listen(user=self.user)
         self.assertTrue(
@@ -201,6 +321,50 @@ class TestAlbumAndTrack(TestCase):
         )
 
 
+class TestPopularityCounters(TestCase):
+
+    def setUp(self):
+        self.user = UserWithBalanceFactory(balance=100)
+        self.album = AlbumFactory(price=10)
+        self.track = TrackFactory(album=self.album, price=10)
+
+    def assertCounters(self, item, **counters):
+        item.refresh_from_db()
+        for name, value in counters.items():
+            self.assertEqual(getattr(item, name), value, name)
+
+    def test_like_and_unlike(self):
+        self.track.like(user=self.user)
+        self.track.like(user=self.user)
+        self.assertCounters(self.track, likes_count=1)
+        self.assertCounters(self.album, likes_count=1)
+
+        self.track.unlike(user=self.user)
+        self.track.unlike(user=self.user)
+        self.assertCounters(self.track, likes_count=0)
+        self.assertCounters(self.album, likes_count=0)
+
+    def test_listen(self):
+        for i in range(3):
+            self.track.listen(user=self.user)
+        self.assertCounters(self.track, listens_count=3)
+        self.assertCounters(self.album, listens_count=3)
+
+    def test_buy(self):
+        self.track.buy(self.user)
+        self.assertCounters(self.track, purchases_count=1)
+        self.assertCounters(self.album, purchases_count=0)
+
+        self.album.buy(self.user)
+        self.assertCounters(self.album, purchases_count=1)
+
+    def test_buy_twice(self):
+        self.track.buy(self.user)
+        with self.assertRaises(ItemAlreadyBought):
+            self.track.buy(self.user)
+        self.assertCounters(self.track, purchases_count=1)
+
+
 class TestLike(TestCase):
 
     def test_create_likes(self):
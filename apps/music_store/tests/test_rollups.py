@@ -0,0 +1,143 @@
+import gzip
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.users.factories import UserFactory
+from ..factories import ListenTrackFactory, TrackFactory
+from ..models import ListenTrack, TrackDailyListens, UserDailyListens
+from ..rollups import (
+    archive_listens,
+    day_range,
+    listens_by_track,
+    rollup_listens,
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def listen(track, user, days_ago):
+    """Create listen of ``track`` by ``user`` ``days_ago`` days ago"""
+    listen = ListenTrackFactory(track=track, user=user)
+    day = timezone.localdate() - timedelta(days_ago)
+    ListenTrack.objects.filter(pk=listen.pk) \
+        .update(created=day_range(day)[0] + timedelta(hours=12))
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+    MEDIA_ROOT=MEDIA_ROOT,
+)
+class TestRollups(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.users = UserFactory.create_batch(2)
+        self.tracks = TrackFactory.create_batch(2)
+        listen(self.tracks[0], self.users[0], days_ago=2)
+        listen(self.tracks[0], self.users[1], days_ago=2)
+        listen(self.tracks[1], self.users[0], days_ago=1)
+        listen(self.tracks[1], self.users[0], days_ago=0)
+
+    def test_rollup_listens(self):
+        days = rollup_listens()
+
+        today = timezone.localdate()
+        self.assertEqual(days, [today - timedelta(2), today - timedelta(1)])
+        self.assertEqual(
+            TrackDailyListens.objects.get(track=self.tracks[0]).count,
+            2,
+        )
+        self.assertEqual(
+            UserDailyListens.objects.get(
+                user=self.users[0],
+                day=today - timedelta(2),
+            ).count,
+            1,
+        )
+        # next run rolls up only the last rolled up day again
+        self.assertEqual(rollup_listens(), [today - timedelta(1)])
+        self.assertEqual(
+            TrackDailyListens.objects.get(track=self.tracks[1]).count,
+            1,
+        )
+
+    def test_rollup_late_listens(self):
+        rollup_listens()
+        listen(self.tracks[1], self.users[1], days_ago=1)
+
+        rollup_listens()
+
+        self.assertEqual(
+            TrackDailyListens.objects.get(track=self.tracks[1]).count,
+            2,
+        )
+        self.assertEqual(
+            UserDailyListens.objects.get(
+                user=self.users[1],
+                day=timezone.localdate() - timedelta(1),
+            ).count,
+            1,
+        )
+
+    def test_archive_listens(self):
+        rollup_listens()
+
+        names = archive_listens(timezone.localdate())
+
+        self.assertEqual(len(names), 2)
+        self.assertEqual(ListenTrack.objects.count(), 1)
+        with default_storage.open(names[0]) as archive:
+            rows = gzip.decompress(archive.read()).decode().splitlines()
+        self.assertEqual(len(rows), 3)
+
+        self.assertEqual(
+            listens_by_track(),
+            {self.tracks[0].pk: 2, self.tracks[1].pk: 2},
+        )
+
+    def test_archive_not_rolled_up_listens(self):
+        self.assertEqual(archive_listens(timezone.localdate()), [])
+        self.assertEqual(ListenTrack.objects.count(), 4)
+
+
+class TestAPIMostPlayed(APITestCase):
+
+    def test_most_played(self):
+        user = UserFactory()
+        tracks = TrackFactory.create_batch(3)
+        listen(tracks[1], user, days_ago=1)
+        listen(tracks[1], user, days_ago=2)
+        listen(tracks[2], user, days_ago=1)
+        listen(tracks[0], user, days_ago=30)
+        rollup_listens()
+
+        response = self.client.get(
+            '/api/v1/music_store/tracks/most_played/?days=7'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(track['id'], track['plays']) for track in response.data],
+            [(tracks[1].id, 2), (tracks[2].id, 1)],
+        )
+
+    def test_most_played_negative_params(self):
+        for params in ({'limit': -1}, {'days': -1}, {'limit': 'x'}):
+            response = self.client.get(
+                '/api/v1/music_store/tracks/most_played/',
+                params,
+            )
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
@@ -1,12 +1,30 @@
+import zipfile
+from datetime import timedelta
+from io import BytesIO
 from unittest.mock import Mock, mock_open, patch
 
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from faker import Faker
 
-from ..tasks import get_albums_from_zip
+from apps.music_store.factories import (
+    AlbumFactory,
+    BoughtAlbumFactory,
+    LikeTrackFactory,
+    ListenTrackFactory,
+    TrackFactory,
+)
+from ..models import Album, ImportJob, Track
+from ..tasks import (
+    fail_archive_import,
+    get_albums_from_zip,
+    import_archive,
+    reconcile_popularity_counters,
+)
 from ..utils import AlbumUploader
 
 fake = Faker()
@@ -52,3 +70,104 @@ class TestGetAlbumsFromZipTask(TestCase):
 
             result = get_albums_from_zip.delay(self.archive)
             self.assertTrue(result.successful())
+
+
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True,
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+)
+class TestImportArchiveTask(TestCase):
+    """Tests for parallel import of albums and tracks from zip file"""
+
+    def setUp(self):
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            for i in range(6):
+                zip_file.writestr(f'author - album {i % 2}/track {i}', 'data')
+            zip_file.writestr('single track', 'data')
+        self.job = ImportJob()
+        self.job.file.save('archive.zip', ContentFile(archive.getvalue()))
+
+    def test_import_archive(self):
+        result = import_archive.delay(self.job.pk, shard_size=2)
+
+        self.assertTrue(result.successful())
+        self.assertEqual(Track.objects.count(), 7)
+        self.assertEqual(Album.objects.count(), 2)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportJob.STATUS_DONE)
+        self.assertEqual(self.job.processed, 7)
+        self.assertEqual(self.job.total, 7)
+        self.assertEqual(self.job.stats['tracks'], 7)
+
+    def test_resume_import_archive(self):
+        """Resumed job skips entries processed before crash"""
+        # first shard (album 0) was processed before crash
+        Album.objects.create(author='author', title='album 0')
+        self.job.shard_offsets = [3, 0, 0]
+        self.job.processed = 3
+        self.job.save()
+
+        import_archive.delay(self.job.pk, shard_size=2)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.processed, 7)
+        self.assertEqual(self.job.stats['tracks'], 4)
+        self.assertFalse(Track.objects.filter(album__title='album 0').exists())
+
+    def test_import_not_zip_file(self):
+        self.job.file.save('archive.zip', ContentFile('not a zip'))
+
+        result = import_archive.delay(self.job.pk)
+
+        self.assertTrue(result.failed())
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportJob.STATUS_FAILED)
+
+    def test_fail_archive_import(self):
+        fail_archive_import('task-id', job_id=self.job.pk)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportJob.STATUS_FAILED)
+
+    def test_resumable_jobs(self):
+        running = ImportJob.objects.create(status=ImportJob.STATUS_RUNNING)
+        stale = ImportJob.objects.create(status=ImportJob.STATUS_RUNNING)
+        failed = ImportJob.objects.create(status=ImportJob.STATUS_FAILED)
+        ImportJob.objects.create(status=ImportJob.STATUS_DONE)
+        ImportJob.objects.filter(pk=stale.pk).update(
+            modified=timezone.now() - timedelta(
+                seconds=settings.MUSIC_STORE_IMPORT_STALE_TIMEOUT + 1,
+            ),
+        )
+
+        self.assertEqual(
+            set(ImportJob.objects.resumable()),
+            {stale, failed},
+        )
+        self.assertNotIn(running, ImportJob.objects.resumable())
+
+
+class TestReconcilePopularityCounters(TestCase):
+
+    def test_reconcile(self):
+        album = AlbumFactory()
+        track = TrackFactory(album=album)
+        LikeTrackFactory(track=track)
+        ListenTrackFactory.create_batch(2, track=track)
+        BoughtAlbumFactory(item=album)
+        Track.objects.filter(pk=track.pk).update(likes_count=5)
+
+        reconcile_popularity_counters()
+
+        track.refresh_from_db()
+        album.refresh_from_db()
+        self.assertEqual(
+            (track.likes_count, track.listens_count, track.purchases_count),
+            (1, 2, 0),
+        )
+        self.assertEqual(
+            (album.likes_count, album.listens_count, album.purchases_count),
+            (1, 2, 1),
+        )
@@ -3,9 +3,12 @@ from ..utils import (
     NestedDirectoryError,
     AlbumUploader,
 )
+from ..content import PreviewReader, store_track_content
 from ..models import Track, Album
+from io import BytesIO
 from unittest.mock import patch, Mock, mock_open
-from django.test import TestCase
+from django.core.files import File
+from django.test import TestCase, override_settings
 from faker import Faker
 
 
@@ -84,3 +87,73 @@ class TestUploadZIPArchive(TestCase):
 
         self.assertEqual(Track.objects.all().count(), 4)
         self.assertEqual(Album.objects.all().count(), 2)
+
+    def test_bulk_zip_album_handler(self):
+        self.archive.infolist = mock_infolist
+        self.archive.open = mock_openfile
+
+        stats = self.handler.bulk_zip_album_handler(self.archive)
+
+        self.assertEqual(
+            stats,
+            {'albums': 2, 'tracks': 4, 'skipped': 0, 'errors': []},
+        )
+        self.assertEqual(Track.objects.all().count(), 4)
+        self.assertEqual(Album.objects.all().count(), 2)
+
+    def test_bulk_zip_album_handler_skips_existing(self):
+        files = mock_infolist()
+        self.archive.infolist = lambda: files
+        self.archive.open = mock_openfile
+
+        self.handler.bulk_zip_album_handler(self.archive)
+        stats = self.handler.bulk_zip_album_handler(self.archive)
+
+        self.assertEqual(
+            stats,
+            {'albums': 0, 'tracks': 0, 'skipped': 4, 'errors': []},
+        )
+        self.assertEqual(Track.objects.all().count(), 4)
+        self.assertEqual(Album.objects.all().count(), 2)
+
+    def test_split_into_shards_keeps_albums(self):
+        names = [f'album {i % 3}/track {i}.txt' for i in range(9)]
+        names += [f'track {i}.txt' for i in range(3)]
+
+        shards = self.handler.split_into_shards(names, shard_size=2)
+
+        self.assertEqual(sorted(sum(shards, [])), sorted(names))
+        for album in ('album 0', 'album 1', 'album 2'):
+            shards_with_album = [
+                shard for shard in shards
+                if any(name.startswith(album) for name in shard)
+            ]
+            self.assertEqual(len(shards_with_album), 1)
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage')
+class TestStoreTrackContent(TestCase):
+    def test_free_version_derived_from_content(self):
+        content = fake.sentence(30).encode()
+        track = Track(title=fake.word())
+        store_track_content(track, BytesIO(content), 'track.txt')
+        track.save()
+
+        self.assertEqual(track.free_version, content[:25].decode())
+        self.assertEqual(track.full_version, '')
+        self.assertEqual(track.content_file.read(), content)
+
+    def test_preview_reader_is_file_like(self):
+        stream = BytesIO(b'content')
+        content = File(PreviewReader(stream, 3), name='track.txt')
+
+        self.assertFalse(content.closed)
+        self.assertTrue(content.readable())
+        self.assertFalse(content.seekable())
+        self.assertEqual(b''.join(content.chunks()), b'content')
+        self.assertEqual(content.file.preview, b'con')
+
+        content.close()
+        self.assertTrue(content.closed)
+        self.assertTrue(stream.closed)
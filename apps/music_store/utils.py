@@ -1,4 +1,9 @@
 import zipfile
+from django.db import transaction
+
+from . import autocomplete
+from .caching import invalidate_catalog
+from .content import store_track_content
 from .models import Album, Track
 from collections import namedtuple
 
@@ -16,6 +21,8 @@ class AlbumUploader:
 
     """
     author_title_delimiter = ' - '
+    # number of rows inserted with one query by bulk handler
+    batch_size = 500
 
     def is_no_folders_in_albums(self, zip_file):
         """Check if album folders contain nested directories"""
@@ -52,6 +59,153 @@ class AlbumUploader:
             self._add_track(track_file, track_data)
             track_file.close()
 
+    def bulk_zip_album_handler(self, zip_file, names=None):
+        """Bulk handler to get Albums and Tracks from zip archive.
+
+        Has the same semantics as ``zip_album_handler``, but works with a
+        constant number of queries per batch instead of several queries per
+        archive entry:
+
+            1. all names of entries are parsed first
+            2. existing albums and tracks are resolved with one query each
+            3. new albums and tracks are inserted with ``bulk_create`` by
+               batches of ``batch_size``
+
+        Content of tracks is streamed from archive into the storage.
+
+        Args:
+            zip_file (ZipFile): archive with Tracks and Albums.
+            names (list): names of archive entries to process, all entries
+                are processed by default.
+
+        Returns:
+            dict: numbers of created albums, created and skipped tracks and
+                list of errors of broken entries.
+
+        """
+        if names is None:
+            names = self.get_track_names(zip_file)
+        entries = [
+            (name, self._get_data_from_filename(name)) for name in names
+        ]
+
+        albums, created_albums = self._bulk_get_or_create_albums(
+            {(data.author, data.album) for _, data in entries if data.album}
+        )
+
+        existing_tracks = set(
+            Track.objects.filter(
+                title__in={data.track for _, data in entries},
+            ).values_list('author', 'title')
+        )
+
+        batch = []
+        errors = []
+        created_tracks = skipped_tracks = 0
+        for filename, data in entries:
+            if (data.author, data.track) in existing_tracks:
+                skipped_tracks += 1
+                continue
+            # archive may contain duplicates too
+            existing_tracks.add((data.author, data.track))
+
+            track = Track(
+                author=data.author,
+                title=data.track,
+                album_id=albums.get((data.author, data.album)),
+            )
+            try:
+                with zip_file.open(filename) as track_file:
+                    store_track_content(track, track_file, data.track)
+            except Exception as e:
+                # broken entry must not break import of the whole archive
+                errors.append({'entry': filename, 'error': str(e)})
+                continue
+            batch.append(track)
+
+            if len(batch) >= self.batch_size:
+                Track.objects.bulk_create(batch)
+                created_tracks += len(batch)
+                batch = []
+
+        Track.objects.bulk_create(batch)
+        created_tracks += len(batch)
+
+        if created_albums or created_tracks:
+            # bulk inserts bypass signals, which update autocomplete index
+            # and invalidate cached catalog
+            transaction.on_commit(autocomplete.reset)
+            transaction.on_commit(invalidate_catalog)
+
+        return {
+            'albums': created_albums,
+            'tracks': created_tracks,
+            'skipped': skipped_tracks,
+            'errors': errors,
+        }
+
+    def get_track_names(self, zip_file):
+        """Get names of track files from archive's central directory"""
+        return [
+            info.filename for info in zip_file.infolist()
+            if not info.filename.endswith('/')
+        ]
+
+    def split_into_shards(self, names, shard_size):
+        """Split names of track files into shards for parallel processing.
+
+        Shards are album-aligned: all tracks of an album get into the same
+        shard, so albums are never created by two shards at once. Tracks
+        without album are grouped by author and title for the same reason.
+        Shard may be bigger than ``shard_size`` if album is bigger.
+
+        Args:
+            names (list): names of track files in archive.
+            shard_size (int): desirable number of tracks in shard.
+
+        Returns:
+            list: lists of track file names.
+
+        """
+        groups = {}
+        for name in names:
+            data = self._get_data_from_filename(name)
+            key = (data.author, data.album) if data.album else data
+            groups.setdefault(key, []).append(name)
+
+        shards = [[]]
+        for group in groups.values():
+            if len(shards[-1]) >= shard_size:
+                shards.append([])
+            shards[-1].extend(group)
+        return [shard for shard in shards if shard]
+
+    def _bulk_get_or_create_albums(self, keys):
+        """Get ids of albums by (author, title) pairs, create missing ones.
+
+        Returns:
+            tuple: dict (author, title) -> album id and number of created
+                albums.
+
+        """
+        albums = {
+            (author, title): pk
+            for author, title, pk in Album.objects.filter(
+                title__in={title for _, title in keys},
+            ).values_list('author', 'title', 'pk')
+            if (author, title) in keys
+        }
+
+        new_albums = [
+            Album(author=author, title=title)
+            for author, title in keys - set(albums)
+        ]
+        Album.objects.bulk_create(new_albums, batch_size=self.batch_size)
+        albums.update(
+            ((album.author, album.title), album.pk) for album in new_albums
+        )
+        return albums, len(new_albums)
+
     def _add_track(self, track_file, track_data):
         """Create Track from file if it does not exist.
 
@@ -73,13 +227,13 @@ class AlbumUploader:
         # check duplicates of track
         if not Track.objects.filter(author=track_data.author,
                                     title=track_data.track).exists():
-            content = track_file.readlines()
-            Track.objects.create(
+            track = Track(
                 author=track_data.author,
                 title=track_data.track,
                 album=album,
-                full_version=content,
             )
+            store_track_content(track, track_file, track_data.track)
+            track.save()
 
     def _get_data_from_filename(self, filename):
         """Get author, album title and track title from filename"""
@@ -113,20 +267,64 @@ class AlbumUploader:
         return 'Unknown artist', audio_name
 
 
-def handle_uploaded_archive(archive_file):
-    """Handler of zip archive with albums and tracks.
+def open_uploaded_archive(archive_file):
+    """Open uploaded zip archive with albums and tracks.
 
     ZIP archive can contain only single files of tracks and album directories
     with track files. Directories CAN NOT contain nested directories.
 
+    Returns:
+        ZipFile: opened archive.
+
+    Raises:
+        TypeError: file is not a zip archive.
+        NestedDirectoryError: album directory contains nested directory.
+
     """
     if not zipfile.is_zipfile(archive_file):
         raise TypeError('It is not a ZIP archive!')
 
+    zf = zipfile.ZipFile(archive_file)
+    if not AlbumUploader().is_no_folders_in_albums(zf):
+        zf.close()
+        raise NestedDirectoryError(f'{zf.name} contains nested directory!')
+    return zf
+
+
+def handle_uploaded_archive(archive_file, bulk=True, names=None):
+    """Handler of zip archive with albums and tracks.
+
+    Args:
+        archive_file (file): uploaded zip archive.
+        bulk (bool): use bulk handler instead of processing archive entry
+            by entry.
+        names (list): names of track files to process with bulk handler,
+            all tracks are processed by default.
+
+    Returns:
+        dict: statistics of bulk handler or None.
+
+    """
     album_uploader = AlbumUploader()
 
-    # process names
-    with zipfile.ZipFile(archive_file) as zf:
-        if not album_uploader.is_no_folders_in_albums(zf):
-            raise NestedDirectoryError(f'{zf.name} contains nested directory!')
+    with open_uploaded_archive(archive_file) as zf:
+        if bulk:
+            return album_uploader.bulk_zip_album_handler(zf, names)
         album_uploader.zip_album_handler(zf)
+
+
+def split_uploaded_archive(archive_file, shard_size):
+    """Split tracks of zip archive into album-aligned shards.
+
+    Only central directory of archive is read.
+
+    Returns:
+        list: lists of track file names (see
+            ``AlbumUploader.split_into_shards``).
+
+    """
+    album_uploader = AlbumUploader()
+
+    with open_uploaded_archive(archive_file) as zf:
+        names = album_uploader.get_track_names(zf)
+    return album_uploader.split_into_shards(names, shard_size)
@@ -14,6 +14,8 @@ from .models import AppUser
 @admin.register(AppUser)
 class AppUserAdmin(UserAdmin):
     inlines = (PaymentMethodInline, PaymentTransactionInline)
+    list_display = UserAdmin.list_display + ('_default_payment',)
+    list_select_related = ('default_payment_method',)
 
     fieldsets = (
         (None, {
@@ -75,6 +77,8 @@ class AppUserAdmin(UserAdmin):
     def _default_payment(self, user):
         return user.default_payment
 
+    _default_payment.short_description = 'Default payment'
+
     def _avatar(self, user):
         if user.avatar:
             return format_html(mark_safe(
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.8 on 2018-05-21 09:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# the latest default method wins, if legacy data has several of them
+FILL_DEFAULT_PAYMENT_METHOD = """
+UPDATE users_appuser AS appuser SET
+    default_payment_method_id = method.id
+FROM (
+    SELECT DISTINCT ON (owner_id) owner_id, id
+    FROM music_store_paymentmethod
+    WHERE is_default
+    ORDER BY owner_id, id DESC
+) AS method
+WHERE method.owner_id = appuser.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music_store', '0010_search_index'),
+        ('users', '0003_appuser_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appuser',
+            name='default_payment_method',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='music_store.PaymentMethod', verbose_name='default payment method'),
+        ),
+        migrations.RunSQL(FILL_DEFAULT_PAYMENT_METHOD, migrations.RunSQL.noop),
+    ]
@@ -37,7 +37,7 @@ class AppUser(AbstractUser):
     Attributes:
         balance(BigInteger): current balance in cents.
         methods_used(PaymentMethod[]): saved payment methods
-        default_method(PaymentMethod): default payment method
+        default_payment_method(PaymentMethod): default payment method
         avatar (file): user's avatar, cropeed to fill 300x300 px
         location (point): latest known GEO coordinates of the user
         location_updated (datetime): latest time user updated coordinates
@@ -82,6 +82,18 @@ class AppUser(AbstractUser):
 
     notifications = HStoreField(null=True)
 
+    # denormalized default of ``payment_methods``, maintained by
+    # ``PaymentMethod.save``
+    default_payment_method = models.ForeignKey(
+        'music_store.PaymentMethod',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name=_('default payment method'),
+        related_name='+',
+    )
+
     # so authentication happens by email instead of username
     # and username becomes sort of nick
     USERNAME_FIELD = 'email'
@@ -99,6 +111,5 @@ class AppUser(AbstractUser):
 
     @property
     def default_payment(self):
-        q = self.payment_methods.filter(is_default=True)
-        if q.exists():
-            return q.first()
+        """Default payment method, loaded with one query at most"""
+        return self.default_payment_method
@@ -31,6 +31,8 @@ from .cors import *
 from .allauth import *
 # Caching Framework (Cacheops)
 from .cacheops import *
+# Celery broker and periodic tasks
+from .celery import *
 
 
 # REST API settings
@@ -1 +1,64 @@
 # This file holds settings specific to the project
+from .testing import TESTING
+
+# Maintain ``AppUser.balance`` incrementally with atomic
+# ``F('balance') + amount`` updates on each new payment transaction.
+# If disabled, balance is re-aggregated from the whole ledger on every save.
+# Use ``manage.py reconcile_balances`` to detect and fix drift.
+MUSIC_STORE_INCREMENTAL_BALANCE = True
+
+# Max number of tracks and albums bought with a single cart checkout
+MUSIC_STORE_CART_MAX_ITEMS = 100
+
+# Desirable number of tracks processed by one celery subtask when uploaded
+# archive is imported in parallel (albums are never split between subtasks)
+MUSIC_STORE_IMPORT_SHARD_SIZE = 1000
+
+# Seconds without progress, after which running import job is considered
+# crashed and can be resumed
+MUSIC_STORE_IMPORT_STALE_TIMEOUT = 30 * 60
+
+# Append listens to Redis buffer on request path and write them into
+# database by batches (see ``apps.music_store.listens``)
+MUSIC_STORE_BUFFERED_LISTENS = True
+
+# Number of buffered listens written into database with a single insert
+MUSIC_STORE_LISTENS_BATCH_SIZE = 1000
+
+# Max number of listens in buffer, i.e. listens which may be lost when
+# Redis fails. Beyond that listens are flushed on request path.
+MUSIC_STORE_LISTENS_BUFFER_LIMIT = 100000
+
+# Raw listens older than this number of days are archived into the file
+# storage and removed from database, daily rollups are kept forever
+MUSIC_STORE_LISTENS_RETENTION_DAYS = 90
+
+# Number of last rolled up days, which are rolled up again on each run to
+# count listens written late (i.e. flushed from buffer after midnight)
+MUSIC_STORE_LISTENS_ROLLUP_OVERLAP_DAYS = 1
+
+# Default period in days of "most played" tracks
+MUSIC_STORE_MOST_PLAYED_DAYS = 7
+
+# Max number of "most played" tracks
+MUSIC_STORE_MOST_PLAYED_LIMIT = 100
+
+# Max number of tracks in a single request of like/ownership statuses
+MUSIC_STORE_TRACK_STATUS_MAX_IDS = 100
+
+# Default and max number of tracks and albums returned by global search
+MUSIC_STORE_SEARCH_LIMIT = 20
+MUSIC_STORE_SEARCH_MAX_LIMIT = 100
+
+# Max number of autocomplete suggestions and how often (in seconds) each
+# process applies changes of catalog made by other processes to its index
+MUSIC_STORE_AUTOCOMPLETE_LIMIT = 10
+MUSIC_STORE_AUTOCOMPLETE_REFRESH_INTERVAL = 5
+
+# Refresh autocomplete index by a background thread of each process, which
+# is started on first lookup (tests refresh index explicitly)
+MUSIC_STORE_AUTOCOMPLETE_BACKGROUND_REFRESH = not TESTING
+
+# Timeout in seconds of Redis sets with ids of tracks and albums bought by
+# user, purchases are added into sets on commit
+MUSIC_STORE_ENTITLEMENTS_CACHE_TIMEOUT = 60 * 60
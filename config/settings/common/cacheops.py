@@ -22,6 +22,12 @@ CACHEOPS = {
     # 'all' is just an alias for ('get', 'fetch', 'count', 'exists')
     'auth.permission': {'ops': 'all', 'timeout': 60*60},
 
+    # Catalog is cached manually in API views (``.cache()``), invalidation
+    # is automatic on save and delete, bulk import invalidates models
+    # explicitly (see ``apps.music_store.caching``)
+    'music_store.album': {'timeout': 60*15},
+    'music_store.track': {'timeout': 60*15},
+
     # Enable manual caching on all other models with default timeout of an hour
     # Use Post.objects.cache().get(...)
     #  or Tags.objects.filter(...).order_by(...).cache()
@@ -1,2 +1,23 @@
+from datetime import timedelta
+
+from celery.schedules import crontab
+
 CELERY_BROKER = 'amqp://guest@rabbitmq/'
 CELERY_BACKEND = 'redis://redis/'
+
+# Periodic tasks run by ``celery beat``
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-popularity-counters': {
+        'task': 'apps.music_store.tasks.reconcile_popularity_counters',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'rollup-daily-listens': {
+        'task': 'apps.music_store.tasks.rollup_daily_listens',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    'flush-listens': {
+        'task': 'apps.music_store.tasks.flush_listens',
+        'schedule': timedelta(seconds=10),
+        'options': {'expires': 10},
+    },
+}
@@ -0,0 +1,88 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from rest_framework.response import Response
+
+__all__ = ('ConditionalGetMixin',)
+
+
+class ConditionalGetMixin(object):
+    """Conditional GET for ``list`` and ``retrieve`` actions of viewset.
+
+    ETag is a hash of ``etag_fields`` of objects of the response (current
+    page for paginated list) and ``get_etag_marker()``, so ``304 Not
+    Modified`` is returned when objects are loaded, but before they are
+    serialized. No extra query over the whole table is made.
+
+    ``Last-Modified`` is not sent, as representation may depend on values,
+    which don't touch ``modified`` (i.e. ``update()`` of counters).
+
+    Example:
+        class ItemViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+            etag_fields = ('modified', 'likes_count')
+
+    """
+    etag_fields = ('modified',)
+
+    def get_etag_marker(self, request):
+        """Get extra value of ETag, i.e. if representation depends on user"""
+        return None
+
+    def get_etag_values(self, obj):
+        """Get values of ``obj`` its representation depends on"""
+        return (obj.pk,) + tuple(
+            getattr(obj, field) for field in self.etag_fields
+        )
+
+    def get_etag(self, request, objects, *extra):
+        """Get ETag of representation of ``objects``"""
+        values = [self.get_etag_values(obj) for obj in objects]
+        values += [self.get_etag_marker(request), *extra]
+        return quote_etag(hashlib.md5(repr(values).encode()).hexdigest())
+
+    def respond_conditionally(self, request, etag, get_response):
+        """Respond with 304 if ``etag`` matches ``If-None-Match`` header.
+
+        Otherwise response is got from ``get_response`` and ETag is set to
+        it.
+
+        """
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = get_response()
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            objects = list(queryset)
+            etag = self.get_etag(request, objects)
+        else:
+            # links to neighbour pages are part of representation too
+            objects = page
+            etag = self.get_etag(
+                request,
+                objects,
+                self.paginator.get_next_link(),
+                self.paginator.get_previous_link(),
+            )
+
+        def get_response():
+            serializer = self.get_serializer(objects, many=True)
+            if page is None:
+                return Response(serializer.data)
+            return self.get_paginated_response(serializer.data)
+
+        return self.respond_conditionally(request, etag, get_response)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_etag(request, [instance])
+        return self.respond_conditionally(
+            request,
+            etag,
+            lambda: Response(self.get_serializer(instance).data),
+        )
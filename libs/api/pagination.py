@@ -1,12 +1,19 @@
+import json
 from base64 import b64encode
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
 
-from rest_framework.pagination import CursorPagination, urlparse
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import Cursor, CursorPagination, urlparse
 
 from constance import config
 
-__all__ = ('OrderByModifiedCursorPagination',)
+__all__ = (
+    'OrderByModifiedCursorPagination',
+    'OrderByIDCursorPagination',
+)
 
 
 class OrderByModifiedCursorPagination(CursorPagination):
@@ -23,11 +30,13 @@ class OrderByModifiedCursorPagination(CursorPagination):
 
     """
     offset_cutoff = None
+    page_size_query_params = ('pageSize',)
 
     def get_page_size(self, request):
         """Returns page size for pagination process
 
-        If ``pageSize`` in request params then return that
+        If ``pageSize`` (or other of ``page_size_query_params``) in request
+        params then return that, but not more than ``max_page_size``
         If ENVIRONMENT is ``development`` then return value from admin's
         constance
         Another way return self.page_size
@@ -36,12 +45,15 @@ class OrderByModifiedCursorPagination(CursorPagination):
             int: page size
         """
         # try get page size from request params
-        query_page_size = request.GET.get('pageSize', None)
-        if query_page_size:
-            try:
-                return int(query_page_size)
-            except ValueError:
-                pass
+        for param in self.page_size_query_params:
+            query_page_size = request.GET.get(param, None)
+            if query_page_size:
+                try:
+                    page_size = int(query_page_size)
+                except ValueError:
+                    continue
+                if page_size > 0:
+                    return min(page_size, self.max_page_size or page_size)
 
         # if site in development mode then return value from admin's constance
         if settings.ENVIRONMENT == 'development':
@@ -82,5 +94,134 @@ class OrderByIDCursorPagination(OrderByModifiedCursorPagination):
     Custom cursor paginated for objects without ``created`` field -- ordering
     by ID.
 
+    Requested ordering (i.e. by ``OrderingFilter``) is supported too, ID is
+    added to it as a tie breaker and position of cursor is a keyset: JSON
+    list of values of all ordering fields of the boundary object. So pages
+    neither skip nor repeat objects with equal values of not unique fields
+    (i.e. popularity counters). Ordering fields must not be nullable.
+
+    ``limit`` of limit/offset pagination is accepted as alias of
+    ``pageSize``, ``offset`` isn't supported.
+
     """
     ordering = 'id'
+    page_size_query_params = ('pageSize', 'limit')
+    max_page_size = 1000
+    offset_not_supported_message = 'Offset is not supported, use cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'offset' in request.query_params:
+            raise ParseError(self.offset_not_supported_message)
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_keyset_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request) or Cursor(
+            offset=0,
+            reverse=False,
+            position=None,
+        )
+
+        ordering = self.ordering
+        if self.cursor.reverse:
+            ordering = [_invert_field(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.cursor.position is not None:
+            position = self.get_keyset_position(queryset.model, ordering)
+            queryset = queryset.filter(_keyset_after(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_following = len(results) > self.page_size
+        has_preceding = self.cursor.position is not None
+        self.page = results[:self.page_size]
+        if self.cursor.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_preceding, has_following
+        else:
+            self.has_next, self.has_previous = has_following, has_preceding
+        return self.page
+
+    def get_keyset_ordering(self, request, queryset, view):
+        """Get requested ordering with ID as the last field"""
+        ordering = list(self.get_ordering(request, queryset, view))
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def get_keyset_position(self, model, ordering):
+        """Get values of ordering fields from position of cursor.
+
+        Values are converted with ``to_python()`` of fields of ``model``.
+
+        Raises:
+            NotFound: position of cursor is malformed.
+
+        """
+        try:
+            position = json.loads(self.cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            model_field = model._meta.pk if name == 'pk' else \
+                model._meta.get_field(name)
+            try:
+                value = model_field.to_python(value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0,
+            reverse=False,
+            position=self._get_keyset(self.page[-1]),
+        ))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0,
+            reverse=True,
+            position=self._get_keyset(self.page[0]),
+        ))
+
+    def _get_keyset(self, obj):
+        """Get position of cursor pointing to ``obj``"""
+        return json.dumps([
+            getattr(obj, field.lstrip('-')) for field in self.ordering
+        ])
+
+
+def _invert_field(field):
+    """Invert direction of ordering by ``field``"""
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _keyset_after(ordering, position):
+    """Get condition of objects following ``position`` in ``ordering``.
+
+    I.e. for ordering ``(-likes_count, -id)`` and position ``[5, 10]`` it's
+    ``likes_count < 5 OR (likes_count = 5 AND id < 10)``.
+
+    """
+    names = [field.lstrip('-') for field in ordering]
+    condition = Q(pk__in=[])
+    for i, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(
+            **dict(zip(names[:i], position[:i])),
+            **{f'{names[i]}__{lookup}': position[i]}
+        )
+    return condition
@@ -1,5 +1,85 @@
+import re
+
 from django.core.files import File
+from django.http import HttpResponse, StreamingHttpResponse
+
+__all__ = (
+    'JSONFile',
+    'ranged_file_response',
+)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
 
 
 class JSONFile(File):
     content_type = "application/json"
+
+
+def iterate_file(file, start, length, chunk_size=64 * 1024):
+    """Read ``length`` bytes of file from ``start`` position by chunks.
+
+    File is closed when it is read.
+
+    """
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def ranged_file_response(request, file,
+                         content_type='application/octet-stream'):
+    """Create streaming response with file content.
+
+    Respects HTTP ``Range`` header, so clients can download file by parts
+    or resume interrupted download. Only single byte range is supported,
+    i.e. ``bytes=first-last``, ``bytes=first-`` or ``bytes=-suffix``.
+
+    Args:
+        request (HttpRequest): request for the file.
+        file (File): opened file, i.e. from ``Storage.open()``.
+        content_type (str): content type of the response.
+
+    Returns:
+        StreamingHttpResponse: with status 200 or 206 (partial content).
+        HttpResponse: with status 416 if range is not satisfiable.
+
+    """
+    size = file.size
+    start, end = 0, size - 1
+    status = 200
+
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if match and any(match.groups()):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # suffix range: last N bytes of file
+            start = max(size - int(last), 0)
+
+        if start > end:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        status = 206
+
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        iterate_file(file, start, length),
+        status=status,
+        content_type=content_type,
+    )
+    response['Content-Length'] = length
+    response['Accept-Ranges'] = 'bytes'
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response